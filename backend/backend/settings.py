@@ -97,6 +97,16 @@ DATABASES = {
     }
 }
 
+# Cache
+# The course catalog snapshot and its version counter live here, so every
+# worker must share one backend (e.g. Redis or Memcached) in production.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
 # User
 AUTH_USER_MODEL = 'content.AppUser'
 
@@ -173,7 +183,7 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOW_ALL_ORIGINS = False  
-CORS_EXPOSE_HEADERS = ['Set-Cookie']
+CORS_EXPOSE_HEADERS = ['Set-Cookie', 'Upload-Offset']
 
 CORS_ALLOW_METHODS = [
     'DELETE',
@@ -194,6 +204,8 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'upload-offset',
+    'upload-checksum',
 ]
 
 REST_FRAMEWORK = {
@@ -203,4 +215,50 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-}
\ No newline at end of file
+    'DEFAULT_PAGINATION_CLASS': 'content.pagination.ContentCursorPagination',
+}
+
+CONTENT_PAGE_SIZE = config('CONTENT_PAGE_SIZE', default=50, cast=int)
+CONTENT_MAX_PAGE_SIZE = config('CONTENT_MAX_PAGE_SIZE', default=200, cast=int)
+
+# How resource previews and downloads are sent: 'django' streams them with
+# Range support, 'accel' only authorizes and hands the file to nginx through
+# X-Accel-Redirect (see frontend/nginx.conf).
+RESOURCE_SERVE_MODE = config('RESOURCE_SERVE_MODE', default='django')
+RESOURCE_ACCEL_REDIRECT_PREFIX = config('RESOURCE_ACCEL_REDIRECT_PREFIX', default='/protected-media/')
+
+# Resumable uploads (admin/lessons/resources/uploads/) stream chunks to disk,
+# so files may be far larger than the 10 MB multipart form allows.
+RESOURCE_UPLOAD_MAX_SIZE = config('RESOURCE_UPLOAD_MAX_SIZE', default=500 * 1024 * 1024, cast=int)
+RESOURCE_UPLOAD_CHUNK_MAX_SIZE = config('RESOURCE_UPLOAD_CHUNK_MAX_SIZE', default=8 * 1024 * 1024, cast=int)
+
+# Processes rendering preview thumbnails and WebP variants after uploads.
+RESOURCE_DERIVATIVE_WORKERS = config('RESOURCE_DERIVATIVE_WORKERS', default=2, cast=int)
+
+# Threads writing uploaded files to storage in parallel, shared by all requests.
+RESOURCE_STORAGE_WRITE_WORKERS = config('RESOURCE_STORAGE_WRITE_WORKERS', default=8, cast=int)
+
+# Uploads are hashed while they stream in so identical resources share one blob.
+FILE_UPLOAD_HANDLERS = [
+    'content.uploads.HashingMemoryFileUploadHandler',
+    'content.uploads.HashingTemporaryFileUploadHandler',
+]
+
+# Log the SQL behind list endpoints such as courses/available/
+CONTENT_QUERY_DEBUG = config('CONTENT_QUERY_DEBUG', default=False, cast=bool)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'content': {
+            'handlers': ['console'],
+            'level': 'DEBUG' if CONTENT_QUERY_DEBUG else 'INFO',
+        },
+    },
+}
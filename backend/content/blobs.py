@@ -0,0 +1,244 @@
+import hashlib
+import logging
+import os
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+
+from .models import Lesson, LessonResource, ResourceBlob, ResourceDerivative, ResourceUploadSession
+
+logger = logging.getLogger(__name__)
+
+RESOURCE_DIR = 'lesson_resources'
+
+_storage_pool = None
+
+
+def uploaded_file_sha256(uploaded_file):
+    # Set while the upload streamed in (content/uploads.py); files built in
+    # code, such as tests or commands, are hashed here instead.
+    digest = getattr(uploaded_file, 'sha256', None)
+    if digest:
+        return digest
+    sha256 = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        sha256.update(chunk)
+    uploaded_file.seek(0)
+    return sha256.hexdigest()
+
+
+def blob_file_name(digest, original_name):
+    return f'{digest[:2]}/{digest}{os.path.splitext(original_name)[1].lower()}'
+
+
+def get_storage_pool():
+    # Bounded and shared by all requests; created on first upload.
+    global _storage_pool
+    if _storage_pool is None:
+        _storage_pool = ThreadPoolExecutor(
+            max_workers=settings.RESOURCE_STORAGE_WRITE_WORKERS, thread_name_prefix='resource-storage'
+        )
+    return _storage_pool
+
+
+def save_blob_file(digest, uploaded_file):
+    return default_storage.save(
+        ResourceBlob._meta.get_field('file').generate_filename(None, blob_file_name(digest, uploaded_file.name)),
+        uploaded_file
+    )
+
+
+def store_blob_files(files_by_digest):
+    """Write each file to storage in parallel; returns {digest: stored name}.
+
+    If any write fails, the files that did land are removed before re-raising.
+    """
+    futures = {
+        digest: get_storage_pool().submit(save_blob_file, digest, uploaded_file)
+        for digest, uploaded_file in files_by_digest.items()
+    }
+    stored, error = {}, None
+    for digest, future in futures.items():
+        try:
+            stored[digest] = future.result()
+        except Exception as e:
+            error = error or e
+    if error:
+        delete_files(stored.values())
+        raise error
+    return stored
+
+
+def lock_blobs(digests):
+    return {blob.sha256: blob for blob in ResourceBlob.objects.select_for_update().filter(sha256__in=digests)}
+
+
+def create_lesson_resources(lesson, uploads):
+    """Create a LessonResource for each (title, uploaded file) pair, sharing blobs by content.
+
+    Files are hashed and written to storage across a thread pool before the
+    transaction opens. Blobs and resources are then inserted with one
+    bulk_create each. Written files are removed again if anything fails.
+    """
+    pool = get_storage_pool()
+    digests = list(pool.map(uploaded_file_sha256, [uploaded_file for _, uploaded_file in uploads]))
+    files_by_digest = {digest: uploaded_file for digest, (_, uploaded_file) in zip(digests, uploads)}
+
+    known = set(ResourceBlob.objects.filter(sha256__in=files_by_digest).values_list('sha256', flat=True))
+    stored = store_blob_files({
+        digest: uploaded_file for digest, uploaded_file in files_by_digest.items() if digest not in known
+    })
+
+    try:
+        with transaction.atomic():
+            # Serializes uploads to the lesson, so the rows just inserted can be
+            # read back where bulk_create cannot return primary keys (MySQL).
+            Lesson.objects.select_for_update().filter(pk=lesson.pk).first()
+
+            # Blobs whose last reference was released since the check above.
+            missing = set(files_by_digest) - set(stored) - set(lock_blobs(files_by_digest))
+            stored.update(store_blob_files({digest: files_by_digest[digest] for digest in missing}))
+
+            ResourceBlob.objects.bulk_create(
+                [
+                    ResourceBlob(sha256=digest, file=name, size=files_by_digest[digest].size)
+                    for digest, name in stored.items()
+                ],
+                ignore_conflicts=True,
+            )
+            blobs = lock_blobs(files_by_digest)
+
+            counts = Counter(digests)
+            ResourceBlob.objects.filter(pk__in=[blob.pk for blob in blobs.values()]).update(ref_count=Case(
+                *[When(pk=blobs[digest].pk, then=F('ref_count') + Value(count)) for digest, count in counts.items()],
+                default=F('ref_count'),
+                output_field=PositiveIntegerField(),
+            ))
+
+            resources = []
+            for digest, (title, _) in zip(digests, uploads):
+                blob = blobs[digest]
+                resource = LessonResource(lesson=lesson, title=title, file=blob.file.name, blob=blob)
+                resource.set_resource_type()
+                resource.set_file_metadata()
+                resources.append(resource)
+            LessonResource.objects.bulk_create(resources)
+            if resources[0].pk is None:
+                resources = list(LessonResource.objects.filter(lesson=lesson).order_by('-id')[:len(resources)])[::-1]
+    except Exception:
+        delete_files(stored.values())
+        raise
+
+    # A concurrent upload of the same content may have won the blob insert.
+    unused = [name for digest, name in stored.items() if blobs[digest].file.name != name]
+    if unused:
+        transaction.on_commit(lambda: delete_files(unused))
+    return resources
+
+
+def create_lesson_resource(lesson, title, uploaded_file):
+    return create_lesson_resources(lesson, [(title, uploaded_file)])[0]
+
+
+def release_blobs(blob_counts):
+    """Drop references by {blob_id: count}; returns file names no longer referenced."""
+    if not blob_counts:
+        return []
+    blobs = ResourceBlob.objects.filter(pk__in=blob_counts.keys())
+    blobs.update(ref_count=Case(
+        *[When(pk=blob_id, then=F('ref_count') - Value(count)) for blob_id, count in blob_counts.items()],
+        default=F('ref_count'),
+        output_field=PositiveIntegerField(),
+    ))
+    unreferenced = blobs.filter(ref_count=0)
+    file_names = list(unreferenced.values_list('file', flat=True))
+    unreferenced.delete()
+    return file_names
+
+
+def delete_files(file_names):
+    # Runs after commit; a file that cannot be removed is left for purge_orphan_files.
+    for file_name in file_names:
+        try:
+            default_storage.delete(file_name)
+        except OSError:
+            logger.exception("Could not delete %s", file_name)
+
+
+def stored_resource_files(min_age):
+    # Skip young files: uploads and renderings are written before their rows commit.
+    root = os.path.join(settings.MEDIA_ROOT, RESOURCE_DIR)
+    cutoff = time.time() - min_age
+    for directory, _, file_names in os.walk(root):
+        for file_name in file_names:
+            path = os.path.join(directory, file_name)
+            try:
+                if os.path.getmtime(path) > cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            yield os.path.relpath(path, settings.MEDIA_ROOT)
+
+
+def referenced_file_names(file_names):
+    referenced = set()
+    for model in (LessonResource, ResourceBlob, ResourceDerivative):
+        referenced.update(model.objects.filter(file__in=file_names).values_list('file', flat=True))
+
+    parts = {
+        os.path.splitext(os.path.basename(file_name))[0]: file_name
+        for file_name in file_names if file_name.endswith('.part')
+    }
+    session_ids = []
+    for session_id in parts:
+        try:
+            session_ids.append(uuid.UUID(session_id))
+        except ValueError:
+            pass
+    referenced.update(
+        parts[str(session_id)]
+        for session_id in ResourceUploadSession.objects.filter(pk__in=session_ids).values_list('pk', flat=True)
+    )
+    return referenced
+
+
+def purge_orphan_files(min_age=3600, batch_size=1000, dry_run=False):
+    """Delete files under lesson_resources/ that no row points at; returns their names."""
+    files = stored_resource_files(min_age)
+    orphans = []
+    while batch := list(islice(files, batch_size)):
+        batch_orphans = sorted(set(batch) - referenced_file_names(batch))
+        if not dry_run:
+            delete_files(batch_orphans)
+        orphans += batch_orphans
+    return orphans
+
+
+@contextmanager
+def releasing_resource_files(resources):
+    """Release the files of `resources` once the block has deleted those rows.
+
+    Blob references are dropped in the same transaction, and files with no
+    references left, along with each resource's derivatives, are unlinked
+    only after it commits.
+    """
+    rows = list(resources.values_list('blob_id', 'file'))
+    derivative_names = list(
+        ResourceDerivative.objects.filter(resource__in=resources).values_list('file', flat=True)
+    )
+    yield
+
+    blob_counts = Counter(blob_id for blob_id, _ in rows if blob_id is not None)
+    # Rows stored before blobs existed own their file outright.
+    file_names = [file_name for blob_id, file_name in rows if blob_id is None and file_name]
+    file_names += release_blobs(blob_counts) + derivative_names
+    if file_names:
+        transaction.on_commit(lambda: delete_files(file_names))
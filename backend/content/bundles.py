@@ -0,0 +1,86 @@
+import logging
+import os
+import re
+import zipfile
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Formats that are already compressed gain nothing from deflate; store them.
+STORED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.docx', '.pptx', '.zip'}
+CHUNK_SIZE = 64 * 1024
+
+
+class ZipOutput:
+    """Write-only sink that hands zipfile's output back to the generator."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        if self.chunks:
+            data, self.chunks = b''.join(self.chunks), []
+            yield data
+
+
+def safe_name(name):
+    return re.sub(r'[^\w\s.-]', '', name).strip() or 'untitled'
+
+
+def bundle_entries(resources, by_lesson=False):
+    """Yield (archive name, resource) with names made unique within the archive."""
+    seen = set()
+    for resource in resources:
+        base, extension = safe_name(resource.title), os.path.splitext(resource.file.name)[1].lower()
+        if by_lesson:
+            base = f'{safe_name(resource.lesson.title)}/{base}'
+        name, copy = f'{base}{extension}', 1
+        while name in seen:
+            copy += 1
+            name = f'{base} ({copy}){extension}'
+        seen.add(name)
+        yield name, resource
+
+
+def stream_zip(entries):
+    """Yield a ZIP of `entries` piece by piece; at most one file chunk is held in memory."""
+    output = ZipOutput()
+    # The sink cannot seek, so zipfile writes sizes and CRCs in data descriptors.
+    with zipfile.ZipFile(output, 'w', allowZip64=True) as archive:
+        for name, resource in entries:
+            try:
+                source = resource.file.open('rb')
+            except FileNotFoundError:
+                logger.warning("Skipping missing file %s in bundle", resource.file.name)
+                continue
+
+            extension = os.path.splitext(name)[1]
+            info = zipfile.ZipInfo(
+                name, date_time=timezone.localtime(resource.modified_at or resource.uploaded_at).timetuple()[:6]
+            )
+            info.compress_type = zipfile.ZIP_STORED if extension in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+            with source, archive.open(info, 'w', force_zip64=True) as destination:
+                for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                    destination.write(chunk)
+                    yield from output.drain()
+            yield from output.drain()
+    yield from output.drain()
+
+
+def bundle_response(resources, filename, by_lesson=False):
+    response = StreamingHttpResponse(
+        stream_zip(bundle_entries(resources, by_lesson)), content_type='application/zip'
+    )
+    response['Content-Disposition'] = f'attachment; filename="{safe_name(filename)}.zip"'
+    # Let nginx pass the archive through as it is produced instead of spooling it.
+    response['X-Accel-Buffering'] = 'no'
+    return response
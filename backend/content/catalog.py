@@ -0,0 +1,53 @@
+import time
+
+from django.core.cache import cache
+
+from .models import Course
+from .pagination import course_title_key
+from .serializers import CourseSerializer
+
+CATALOG_VERSION_KEY = 'content:catalog:version'
+CATALOG_SNAPSHOT_KEY = 'content:catalog:v2:{version}'
+CATALOG_SNAPSHOT_TIMEOUT = 60 * 60
+LEARNER_VERSION_KEY = 'content:learner:{user_id}:version'
+
+
+def get_version(key):
+    # Seed from the clock so a cache restart never reuses an old version number.
+    cache.add(key, int(time.time()), timeout=None)
+    return cache.get(key)
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, int(time.time()), timeout=None)
+
+
+def get_catalog_version():
+    return get_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    bump_version(CATALOG_VERSION_KEY)
+
+
+def get_learner_version(user_id):
+    # Covers everything per learner that the course and lesson lists show:
+    # enrollments and lesson completion.
+    return get_version(LEARNER_VERSION_KEY.format(user_id=user_id))
+
+
+def bump_learner_version(user_id):
+    bump_version(LEARNER_VERSION_KEY.format(user_id=user_id))
+
+
+def get_catalog_snapshot():
+    key = CATALOG_SNAPSHOT_KEY.format(version=get_catalog_version())
+    snapshot = cache.get(key)
+    if snapshot is None:
+        courses = Course.objects.filter(is_visible=True).select_related('instructor')
+        snapshot = sorted(CourseSerializer(courses, many=True).data, key=course_title_key)
+        cache.set(key, snapshot, CATALOG_SNAPSHOT_TIMEOUT)
+    return snapshot
@@ -0,0 +1,61 @@
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .catalog import get_catalog_version, get_learner_version
+from .models import LessonResource
+
+
+def conditional(etag_func=None, last_modified_func=None):
+    # condition() answers 304 before the view runs; no-cache makes the browser
+    # revalidate every time instead of trusting a heuristic freshness window.
+    def decorator(view):
+        conditional_view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view)
+
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return inner
+    return decorator
+
+
+def learner_courses_etag(request, *args, **kwargs):
+    return f'courses-{request.user.pk}-{get_catalog_version()}-{get_learner_version(request.user.pk)}'
+
+
+def course_lessons_etag(request, course_id, *args, **kwargs):
+    return (
+        f'lessons-{course_id}-{request.user.pk}-'
+        f'{get_catalog_version()}-{get_learner_version(request.user.pk)}'
+    )
+
+
+def _lesson_resource_stats(request, lesson_id):
+    # Resources are only ever added or deleted, so count, newest id and newest
+    # upload time identify the list; metadata recorded later (by
+    # backfill_resource_metadata) shows in how many rows have modified_at and
+    # the newest one. Cached on the request for both validators.
+    if not hasattr(request, '_lesson_resource_stats'):
+        request._lesson_resource_stats = LessonResource.objects.filter(lesson_id=lesson_id).aggregate(
+            count=Count('id'), last_id=Max('id'), last_uploaded=Max('uploaded_at'),
+            recorded=Count('modified_at'), last_modified=Max('modified_at')
+        )
+    return request._lesson_resource_stats
+
+
+def lesson_resources_etag(request, lesson_id, *args, **kwargs):
+    stats = _lesson_resource_stats(request, lesson_id)
+    last_modified = stats['last_modified'].timestamp() if stats['last_modified'] else 0
+    return (
+        f"resources-{lesson_id}-{stats['count']}-{stats['last_id'] or 0}-"
+        f"{stats['recorded']}-{last_modified}"
+    )
+
+
+def lesson_resources_last_modified(request, lesson_id, *args, **kwargs):
+    stats = _lesson_resource_stats(request, lesson_id)
+    return max(filter(None, [stats['last_uploaded'], stats['last_modified']]), default=None)
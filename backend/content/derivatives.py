@@ -0,0 +1,128 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import IntegrityError
+
+from .imaging import VARIANTS, render_derivatives
+from .models import LessonResource, ResourceDerivative
+from .tasks import run_on_commit
+
+logger = logging.getLogger(__name__)
+
+PREVIEWABLE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.pdf'}
+
+_pool = None
+
+
+def get_pool():
+    # Created on first use so web workers that never render start no workers.
+    # Requests and the task and storage pools run threads here, and forking a
+    # threaded process can deadlock the child, so workers come from a forkserver.
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.RESOURCE_DERIVATIVE_WORKERS, mp_context=multiprocessing.get_context('forkserver')
+        )
+    return _pool
+
+
+def extension(resource):
+    return os.path.splitext(resource.file.name)[1].lower()
+
+
+def is_previewable(resource):
+    return resource.allow_preview and extension(resource) in PREVIEWABLE_EXTENSIONS
+
+
+def remove_files(paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def generate_derivatives(resource_id):
+    resource = LessonResource.objects.filter(pk=resource_id).first()
+    if resource is None or not is_previewable(resource):
+        return 0
+
+    # Stored beside the original; the resource id keeps two resources that
+    # share a blob from writing over each other's renderings.
+    target_stem = f'{os.path.splitext(resource.file.path)[0]}.{resource.pk}'
+    rendered = get_pool().submit(
+        render_derivatives, resource.file.path, target_stem, extension(resource) == '.pdf'
+    ).result()
+
+    derivatives = [
+        ResourceDerivative(
+            resource_id=resource.pk,
+            kind=item['kind'],
+            file=os.path.relpath(item['path'], settings.MEDIA_ROOT),
+            content_type=item['content_type'],
+            width=item['width'],
+            height=item['height'],
+            size=os.path.getsize(item['path']),
+        )
+        for item in rendered
+    ]
+    try:
+        ResourceDerivative.objects.bulk_create(
+            derivatives,
+            update_conflicts=True,
+            unique_fields=['resource', 'kind'],
+            update_fields=['file', 'content_type', 'width', 'height', 'size'],
+        )
+    except IntegrityError:
+        # The resource was deleted while rendering.
+        remove_files(item['path'] for item in rendered)
+        return 0
+    return len(derivatives)
+
+
+def generate_derivatives_for(resource_ids):
+    for resource_id in resource_ids:
+        try:
+            generate_derivatives(resource_id)
+        except Exception:
+            logger.exception("Could not render derivatives for resource %s", resource_id)
+
+
+def schedule_derivatives(resources):
+    resource_ids = [resource.pk for resource in resources if is_previewable(resource)]
+    if resource_ids:
+        run_on_commit(generate_derivatives_for, resource_ids)
+
+
+def covers(derivative, width):
+    # A rendering narrower than its variant's target was not downscaled, so it
+    # already holds every pixel of the original.
+    return derivative.width >= width or derivative.width < VARIANTS[derivative.kind][0]
+
+
+def pick_preview(resource, derivatives, width=None, accept_webp=False):
+    """Return the derivative to preview instead of the original, or None for the original.
+
+    PDFs keep previewing as documents unless a width is asked for; images get
+    the fewest bytes among renderings at least `width` (default: display) wide.
+    """
+    is_pdf = extension(resource) == '.pdf'
+    if is_pdf and width is None:
+        return None
+
+    width = width or VARIANTS['display'][0]
+    candidates = [
+        derivative for derivative in derivatives
+        if accept_webp or derivative.content_type != 'image/webp'
+    ]
+    suitable = [derivative for derivative in candidates if covers(derivative, width)]
+    if not suitable:
+        # Nothing is wide enough: an image original is, a PDF has only rasters.
+        return max(candidates, key=lambda derivative: derivative.width, default=None) if is_pdf else None
+
+    smallest = min(suitable, key=lambda derivative: derivative.size)
+    size = resource.size if resource.size is not None else resource.file.size
+    if not is_pdf and size <= smallest.size:
+        return None
+    return smallest
@@ -0,0 +1,67 @@
+"""Rendering of preview derivatives.
+
+Runs inside worker processes, so it depends on Pillow and pypdfium2 only and
+never touches Django settings or the database.
+"""
+from PIL import Image, ImageOps
+
+# kind: (target width, format); images are never scaled up.
+VARIANTS = {
+    'thumbnail': (320, None),
+    'thumbnail_webp': (320, 'WEBP'),
+    'display': (1280, None),
+    'display_webp': (1280, 'WEBP'),
+}
+CONTENT_TYPES = {'JPEG': 'image/jpeg', 'PNG': 'image/png', 'WEBP': 'image/webp'}
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp'}
+
+
+def open_source(path, is_pdf):
+    if is_pdf:
+        import pypdfium2
+
+        pdf = pypdfium2.PdfDocument(path)
+        try:
+            page = pdf[0]
+            scale = VARIANTS['display'][0] / page.get_width()
+            return page.render(scale=scale).to_pil()
+        finally:
+            pdf.close()
+
+    image = Image.open(path)
+    image.load()
+    return ImageOps.exif_transpose(image)
+
+
+def render_derivatives(source_path, target_stem, is_pdf):
+    """Write every variant as `<target_stem>.<kind>.<ext>` and return their metadata.
+
+    Image originals already serve as their own full-size non-WebP rendering,
+    so `display` is only produced for PDFs.
+    """
+    source = open_source(source_path, is_pdf)
+    has_alpha = source.mode in ('RGBA', 'LA') or (source.mode == 'P' and 'transparency' in source.info)
+    fallback_format = 'PNG' if has_alpha or is_pdf else 'JPEG'
+
+    rendered = []
+    for kind, (target_width, image_format) in VARIANTS.items():
+        if kind == 'display' and not is_pdf:
+            continue
+        image_format = image_format or fallback_format
+        image = source.copy()
+        image.thumbnail((target_width, target_width * 4), Image.Resampling.LANCZOS)
+        if image_format == 'JPEG':
+            image = image.convert('RGB')
+        elif image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if has_alpha else 'RGB')
+
+        path = f'{target_stem}.{kind}.{EXTENSIONS[image_format]}'
+        image.save(path, image_format, quality=80, optimize=True)
+        rendered.append({
+            'kind': kind,
+            'path': path,
+            'width': image.width,
+            'height': image.height,
+            'content_type': CONTENT_TYPES[image_format],
+        })
+    return rendered
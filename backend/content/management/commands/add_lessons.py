@@ -1,5 +1,5 @@
 from django.core.management.base import BaseCommand
-from content.models import Course, Lesson
+from content.models import LESSON_RANK_GAP, Course, Lesson
 
 class Command(BaseCommand):
     help = 'Add lessons to existing courses in the database'
@@ -38,7 +38,7 @@ class Command(BaseCommand):
                         course=course,
                         title=lesson["title"],
                         description=lesson["description"],
-                        order=index + 1  
+                        rank=(index + 1) * LESSON_RANK_GAP
                     )
                     for index, lesson in enumerate(lesson_data[course.title])
                 ]
@@ -0,0 +1,40 @@
+import os
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand
+
+from content.models import LessonResource
+
+
+class Command(BaseCommand):
+    help = 'Record size, MIME type, sha256 and modification time for resources uploaded without them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows written per UPDATE')
+
+    def handle(self, *args, **options):
+        resources = LessonResource.objects.filter(size__isnull=True).select_related('blob')
+        batch, updated, missing = [], 0, 0
+
+        for resource in resources.iterator(chunk_size=options['batch_size']):
+            try:
+                modified_at = datetime.fromtimestamp(os.path.getmtime(resource.file.path), tz=timezone.utc)
+                with resource.file.open('rb'):
+                    resource.set_file_metadata(modified_at=modified_at)
+            except FileNotFoundError:
+                missing += 1
+                self.stderr.write(f"Resource {resource.pk}: {resource.file.name} is missing")
+                continue
+
+            batch.append(resource)
+            if len(batch) >= options['batch_size']:
+                updated += self.save(batch)
+
+        updated += self.save(batch)
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {updated} resources ({missing} files missing)."))
+
+    def save(self, batch):
+        LessonResource.objects.bulk_update(batch, ['size', 'content_type', 'sha256', 'modified_at'])
+        count = len(batch)
+        batch.clear()
+        return count
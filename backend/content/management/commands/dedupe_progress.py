@@ -0,0 +1,68 @@
+from collections import defaultdict
+from functools import partial
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, Max, Min
+from django.db.models.functions import Cast
+
+from content.models import CourseProgress, LessonProgress
+from content.stats import rebuild_course_stats
+from content.utils import bump_learner_versions, recompute_course_progress
+
+
+class Command(BaseCommand):
+    help = 'Merge duplicate LessonProgress and CourseProgress rows for the same user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report duplicates without changing anything')
+
+    def handle(self, *args, **options):
+        lesson_duplicates = list(
+            LessonProgress.objects.values('user_id', 'lesson_id', 'lesson__course_id')
+            .annotate(
+                rows=Count('id'),
+                keep=Min('id'),
+                done=Max(Cast('completed', IntegerField()))
+            )
+            .filter(rows__gt=1)
+        )
+        course_duplicates = list(
+            CourseProgress.objects.values('user_id', 'course_id')
+            .annotate(rows=Count('id'), keep=Min('id'))
+            .filter(rows__gt=1)
+        )
+
+        self.stdout.write(
+            f"Found {len(lesson_duplicates)} duplicated lesson progress entries and "
+            f"{len(course_duplicates)} duplicated course progress entries."
+        )
+        if options['dry_run']:
+            return
+
+        affected = defaultdict(set)
+        with transaction.atomic():
+            for group in lesson_duplicates:
+                # A lesson counts as completed if any of its duplicate rows says so.
+                rows = LessonProgress.objects.filter(user_id=group['user_id'], lesson_id=group['lesson_id'])
+                rows.exclude(id=group['keep']).delete()
+                rows.update(completed=bool(group['done']))
+                affected[group['user_id']].add(group['lesson__course_id'])
+
+            for group in course_duplicates:
+                CourseProgress.objects.filter(
+                    user_id=group['user_id'], course_id=group['course_id']
+                ).exclude(id=group['keep']).delete()
+                affected[group['user_id']].add(group['course_id'])
+
+            # Recomputed with plain updates: an upsert needs the unique
+            # constraints this command exists to make room for.
+            for course_id in sorted(set().union(*affected.values())):
+                recompute_course_progress(course_id)
+
+            # The removed duplicates were counted in the course stats too.
+            rebuild_course_stats(set().union(*affected.values()))
+            # Queryset deletes and updates send no signals to invalidate the learners' lists.
+            transaction.on_commit(partial(bump_learner_versions, list(affected)))
+
+        self.stdout.write(self.style.SUCCESS(f"Merged duplicates for {len(affected)} users."))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from content.derivatives import generate_derivatives, is_previewable
+from content.models import LessonResource
+
+
+class Command(BaseCommand):
+    help = 'Render preview thumbnails and WebP variants for image and PDF resources'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-render resources that already have derivatives')
+
+    def handle(self, *args, **options):
+        resources = LessonResource.objects.filter(allow_preview=True)
+        if not options['all']:
+            resources = resources.filter(derivatives__isnull=True)
+
+        rendered = failed = 0
+        for resource in resources.iterator():
+            if not is_previewable(resource):
+                continue
+            try:
+                generate_derivatives(resource.pk)
+                rendered += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"Resource {resource.pk}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(f"Rendered derivatives for {rendered} resources ({failed} failed)."))
@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from content.blobs import purge_orphan_files
+from content.models import ResourceUploadSession
+
+
+class Command(BaseCommand):
+    help = 'Delete files under media/lesson_resources/ that no resource, blob, derivative or upload refers to'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='List orphans without deleting them')
+        parser.add_argument('--min-age', type=int, default=3600, help='Leave files younger than this many seconds')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Files checked against the database per query')
+        parser.add_argument(
+            '--expire-uploads', type=int, metavar='HOURS',
+            help='First drop resumable uploads with no chunk received for this many hours'
+        )
+
+    def handle(self, *args, **options):
+        if options['expire_uploads'] is not None and not options['dry_run']:
+            cutoff = timezone.now() - timedelta(hours=options['expire_uploads'])
+            expired, _ = ResourceUploadSession.objects.filter(updated_at__lt=cutoff).delete()
+            self.stdout.write(f"Expired {expired} abandoned uploads.")
+
+        orphans = purge_orphan_files(options['min_age'], options['batch_size'], options['dry_run'])
+        for file_name in orphans:
+            self.stdout.write(file_name, style_func=None if options['dry_run'] else self.style.WARNING)
+        verb = 'Found' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {len(orphans)} orphaned files."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from content.stats import rebuild_course_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the CourseStats enrollment and progress counters from Enrollment and CourseProgress'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, action='append', help='Only rebuild stats for this course ID (repeatable)')
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_course_stats(options['course'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {rebuilt} courses."))
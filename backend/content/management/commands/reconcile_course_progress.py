@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from content.models import Course
+from content.utils import PROGRESS_RECOMPUTE_BATCH_SIZE, recompute_course_progress
+
+
+class Command(BaseCommand):
+    help = 'Recompute CourseProgress lesson counters and percentages, repairing any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, help='Only recompute progress for this course ID')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=PROGRESS_RECOMPUTE_BATCH_SIZE,
+            help='Number of progress rows to update per batch'
+        )
+
+    def handle(self, *args, **options):
+        course_ids = Course.objects.order_by('course_id').values_list('course_id', flat=True)
+        if options['course']:
+            course_ids = course_ids.filter(course_id=options['course'])
+
+        total = 0
+        for course_id in course_ids.iterator():
+            recomputed = recompute_course_progress(course_id, batch_size=options['batch_size'])
+            total += recomputed
+            self.stdout.write(f"Course {course_id}: recomputed {recomputed} progress records.")
+
+        self.stdout.write(self.style.SUCCESS(f"Recomputed {total} course progress records."))
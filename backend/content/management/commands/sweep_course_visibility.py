@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from content.utils import sweep_visibility_transitions
+
+
+class Command(BaseCommand):
+    help = 'Flip course visibility for every course whose scheduled start or end date has passed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep sweeping until interrupted')
+        parser.add_argument('--interval', type=int, default=60, help='Seconds between sweeps when looping')
+
+    def handle(self, *args, **options):
+        while True:
+            flipped = sweep_visibility_transitions()
+            self.stdout.write(f"Flipped visibility on {flipped} courses.")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.3 on 2026-10-17 21:09
+
+from django.db import migrations, models
+
+
+def backfill_counters(apps, schema_editor):
+    CourseProgress = apps.get_model('content', 'CourseProgress')
+    Lesson = apps.get_model('content', 'Lesson')
+    LessonProgress = apps.get_model('content', 'LessonProgress')
+
+    totals = {
+        row['course_id']: row['total']
+        for row in Lesson.objects.values('course_id').annotate(total=models.Count('lesson_id'))
+    }
+    completed = {
+        (row['user_id'], row['lesson__course_id']): row['done']
+        for row in LessonProgress.objects.filter(completed=True)
+        .values('user_id', 'lesson__course_id')
+        .annotate(done=models.Count('lesson_id', distinct=True))
+    }
+
+    progresses = list(CourseProgress.objects.all())
+    for progress in progresses:
+        progress.total_lessons = totals.get(progress.course_id, 0)
+        progress.completed_lessons = completed.get((progress.user_id, progress.course_id), 0)
+    CourseProgress.objects.bulk_update(progresses, ['total_lessons', 'completed_lessons'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0008_alter_lessonresource_title'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='courseprogress',
+            name='completed_lessons',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='courseprogress',
+            name='total_lessons',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
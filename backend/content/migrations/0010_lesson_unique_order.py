@@ -0,0 +1,31 @@
+# Generated by Django 5.1.3 on 2026-10-17 21:10
+
+from django.db import migrations, models
+
+
+def renumber_lessons(apps, schema_editor):
+    Lesson = apps.get_model('content', 'Lesson')
+
+    renumbered = []
+    position = {}
+    for lesson in Lesson.objects.order_by('course_id', 'order', 'lesson_id'):
+        position[lesson.course_id] = position.get(lesson.course_id, 0) + 1
+        if lesson.order != position[lesson.course_id]:
+            lesson.order = position[lesson.course_id]
+            renumbered.append(lesson)
+    Lesson.objects.bulk_update(renumbered, ['order'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0009_courseprogress_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(renumber_lessons, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='lesson',
+            constraint=models.UniqueConstraint(fields=('course', 'order'), name='unique_lesson_order_per_course'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.3 on 2026-10-17 21:12
+
+from django.db import migrations, models
+
+
+def ranks_from_order(apps, schema_editor):
+    Lesson = apps.get_model('content', 'Lesson')
+    Lesson.objects.update(rank=models.F('order') * 1024)
+
+
+def order_from_ranks(apps, schema_editor):
+    Lesson = apps.get_model('content', 'Lesson')
+
+    renumbered = []
+    position = {}
+    for lesson in Lesson.objects.order_by('course_id', 'rank'):
+        position[lesson.course_id] = position.get(lesson.course_id, 0) + 1
+        lesson.order = position[lesson.course_id]
+        renumbered.append(lesson)
+    Lesson.objects.bulk_update(renumbered, ['order'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0010_lesson_unique_order'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='lesson',
+            name='unique_lesson_order_per_course',
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='rank',
+            field=models.PositiveBigIntegerField(default=1024),
+        ),
+        migrations.RunPython(ranks_from_order, order_from_ranks),
+        migrations.RemoveField(
+            model_name='lesson',
+            name='order',
+        ),
+        migrations.AddConstraint(
+            model_name='lesson',
+            constraint=models.UniqueConstraint(fields=('course', 'rank'), name='unique_lesson_rank_per_course'),
+        ),
+    ]
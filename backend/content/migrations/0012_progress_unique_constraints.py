@@ -0,0 +1,49 @@
+# Generated by Django 5.1.3 on 2026-10-17 21:14
+
+from django.db import migrations, models
+from django.db.models.functions import Cast
+
+
+def merge_duplicates(apps, schema_editor):
+    LessonProgress = apps.get_model('content', 'LessonProgress')
+    CourseProgress = apps.get_model('content', 'CourseProgress')
+
+    duplicates = (
+        LessonProgress.objects.values('user_id', 'lesson_id')
+        .annotate(rows=models.Count('id'), keep=models.Min('id'),
+                  done=models.Max(Cast('completed', models.IntegerField())))
+        .filter(rows__gt=1)
+    )
+    for group in duplicates:
+        rows = LessonProgress.objects.filter(user_id=group['user_id'], lesson_id=group['lesson_id'])
+        rows.exclude(id=group['keep']).delete()
+        rows.update(completed=bool(group['done']))
+
+    duplicates = (
+        CourseProgress.objects.values('user_id', 'course_id')
+        .annotate(rows=models.Count('id'), keep=models.Min('id'))
+        .filter(rows__gt=1)
+    )
+    for group in duplicates:
+        CourseProgress.objects.filter(
+            user_id=group['user_id'], course_id=group['course_id']
+        ).exclude(id=group['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0011_lesson_rank'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='courseprogress',
+            constraint=models.UniqueConstraint(fields=('user', 'course'), name='unique_course_progress_per_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='lessonprogress',
+            constraint=models.UniqueConstraint(fields=('user', 'lesson'), name='unique_lesson_progress_per_user'),
+        ),
+    ]
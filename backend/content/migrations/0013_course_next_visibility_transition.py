@@ -0,0 +1,33 @@
+# Generated by Django 5.1.3 on 2026-10-17 21:16
+
+from django.db import migrations, models
+
+
+def schedule_existing_courses(apps, schema_editor):
+    Course = apps.get_model('content', 'Course')
+
+    # Point every scheduled course at its earliest date; the first sweep then
+    # settles is_visible and moves the marker to the next real transition.
+    scheduled = list(
+        Course.objects.exclude(visibility_start_date__isnull=True, visibility_end_date__isnull=True)
+    )
+    for course in scheduled:
+        dates = [d for d in (course.visibility_start_date, course.visibility_end_date) if d]
+        course.next_visibility_transition_at = min(dates)
+    Course.objects.bulk_update(scheduled, ['next_visibility_transition_at'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0012_progress_unique_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='next_visibility_transition_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(schedule_existing_courses, migrations.RunPython.noop),
+    ]
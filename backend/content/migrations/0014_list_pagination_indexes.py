@@ -0,0 +1,26 @@
+# Generated by Django 5.1.3 on 2026-10-17 21:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0013_course_next_visibility_transition'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='event',
+            name='start_time',
+            field=models.DateTimeField(db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['instructor', '-created_at', '-course_id'], name='course_instructor_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lessonresource',
+            index=models.Index(fields=['lesson', 'uploaded_at', 'id'], name='resource_lesson_uploaded_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.3 on 2026-10-17 21:30
+
+from django.db import migrations
+
+# Column lists must match the MATCH () clauses built in content/search.py.
+FULLTEXT_INDEXES = [
+    ('content_course', 'course_search_ft', ('title', 'description', 'level')),
+    ('content_lesson', 'lesson_search_ft', ('title', 'description')),
+]
+
+
+def add_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    for table, name, columns in FULLTEXT_INDEXES:
+        schema_editor.execute(
+            f"CREATE FULLTEXT INDEX {name} ON {table} ({', '.join(columns)})"
+        )
+
+
+def drop_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    for table, name, _ in FULLTEXT_INDEXES:
+        schema_editor.execute(f"DROP INDEX {name} ON {table}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0014_list_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_fulltext_indexes, drop_fulltext_indexes),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.1.3 on 2026-10-17 21:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+# Mirrors PROGRESS_HISTOGRAM_BUCKETS in content/models.py at the time of writing.
+BUCKETS = {
+    'not_started_count': Q(progress_percentage=0),
+    'progress_0_25_count': Q(progress_percentage__gt=0, progress_percentage__lt=25),
+    'progress_25_50_count': Q(progress_percentage__gte=25, progress_percentage__lt=50),
+    'progress_50_75_count': Q(progress_percentage__gte=50, progress_percentage__lt=75),
+    'progress_75_100_count': Q(progress_percentage__gte=75, progress_percentage__lt=100),
+    'completed_count': Q(progress_percentage__gte=100),
+}
+
+
+def backfill_course_stats(apps, schema_editor):
+    Course = apps.get_model('content', 'Course')
+    CourseProgress = apps.get_model('content', 'CourseProgress')
+    CourseStats = apps.get_model('content', 'CourseStats')
+    Enrollment = apps.get_model('content', 'Enrollment')
+
+    enrolled = dict(
+        Enrollment.objects.values('course_id').annotate(count=Count('id')).values_list('course_id', 'count')
+    )
+    progress = {
+        row.pop('course_id'): row
+        for row in CourseProgress.objects.values('course_id').annotate(
+            progress_total=Sum('progress_percentage'),
+            **{field: Count('id', filter=condition) for field, condition in BUCKETS.items()}
+        )
+    }
+    CourseStats.objects.bulk_create(
+        [
+            CourseStats(
+                course_id=course_id,
+                enrolled_count=enrolled.get(course_id, 0),
+                **progress.get(course_id, {})
+            )
+            for course_id in Course.objects.values_list('course_id', flat=True)
+        ],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0015_search_fulltext_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseStats',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='content.course')),
+                ('enrolled_count', models.IntegerField(default=0)),
+                ('progress_total', models.FloatField(default=0.0)),
+                ('not_started_count', models.IntegerField(default=0)),
+                ('progress_0_25_count', models.IntegerField(default=0)),
+                ('progress_25_50_count', models.IntegerField(default=0)),
+                ('progress_50_75_count', models.IntegerField(default=0)),
+                ('progress_75_100_count', models.IntegerField(default=0)),
+                ('completed_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_course_stats, migrations.RunPython.noop),
+    ]
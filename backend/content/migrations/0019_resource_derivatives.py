@@ -0,0 +1,31 @@
+# Generated by Django 5.1.3 on 2026-10-17 21:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0018_resource_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceDerivative',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('thumbnail', 'Thumbnail'), ('thumbnail_webp', 'Thumbnail (WebP)'), ('display', 'Display'), ('display_webp', 'Display (WebP)')], max_length=20)),
+                ('file', models.FileField(upload_to='lesson_resources/')),
+                ('content_type', models.CharField(max_length=50)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('size', models.PositiveBigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('resource', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='derivatives', to='content.lessonresource')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('resource', 'kind'), name='unique_resource_derivative_kind')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.3 on 2026-10-17 21:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0019_resource_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lessonresource',
+            name='content_type',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='lessonresource',
+            name='modified_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='lessonresource',
+            name='sha256',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='lessonresource',
+            name='size',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+    ]
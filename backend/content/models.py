@@ -1,6 +1,9 @@
 # models.py 
+import hashlib
+import mimetypes
 import os
 from django.db import models
+from django.db.models.functions import RowNumber
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
@@ -103,9 +106,13 @@ class Course(models.Model):
     is_visible = models.BooleanField(default=False, db_index=True)  
     visibility_start_date = models.DateTimeField(null=True, blank=True)
     visibility_end_date = models.DateTimeField(null=True, blank=True)
+    next_visibility_transition_at = models.DateTimeField(null=True, blank=True, db_index=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['instructor', '-created_at', '-course_id'], name='course_instructor_created_idx'),
+        ]
     
     def clean(self):
         if self.instructor and self.instructor.role != 'admin':
@@ -123,16 +130,27 @@ class Course(models.Model):
                     'visibility_end_date': 'End date must be after start date'
                 })
     
-    def save(self, *args, **kwargs):
-        self.clean()
+    def apply_visibility_schedule(self, now=None):
+        now = now or timezone.now()
         if self.visibility_start_date:
-            now = timezone.now()
             if self.visibility_end_date:
                 self.is_visible = (
                     self.visibility_start_date <= now <= self.visibility_end_date
                 )
             else:
                 self.is_visible = self.visibility_start_date <= now
+        elif self.visibility_end_date and now > self.visibility_end_date:
+            self.is_visible = False
+
+        upcoming = [
+            date for date in (self.visibility_start_date, self.visibility_end_date)
+            if date and date >= now
+        ]
+        self.next_visibility_transition_at = min(upcoming) if upcoming else None
+
+    def save(self, *args, **kwargs):
+        self.clean()
+        self.apply_visibility_schedule()
         super().save(*args, **kwargs)
         
     def __str__(self):
@@ -161,16 +179,48 @@ class Enrollment(models.Model):
     def __str__(self):
         return f"{self.user.name} - {self.course.title}"
     
+LESSON_RANK_GAP = 1024
+
+class LessonQuerySet(models.QuerySet):
+    def with_display_order(self):
+        return self.annotate(
+            display_order=models.Window(
+                expression=RowNumber(),
+                partition_by=[models.F('course_id')],
+                order_by=models.F('rank').asc(),
+            )
+        ).order_by('course_id', 'rank')
+
 class Lesson(models.Model):
     lesson_id = models.AutoField(primary_key=True, null=False, blank=False)
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='lessons')  
     title = models.CharField(max_length=35, null=False, blank=False)
     description = models.TextField(max_length=250,null=True, blank=True)    
-    order = models.PositiveIntegerField(default=0, null=False, blank=False)  
+    # Sparse sort key; the 1..n position shown to users is derived from it.
+    rank = models.PositiveBigIntegerField(default=LESSON_RANK_GAP, null=False, blank=False)
+
+    objects = LessonQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'rank'], name='unique_lesson_rank_per_course'),
+        ]
 
     def __str__(self):
         return f"Lesson: {self.title} (Course: {self.course.title})"
 
+class ResourceBlob(models.Model):
+    # One stored copy per distinct file content; LessonResource rows point at it
+    # and ref_count tracks how many do.
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(upload_to='lesson_resources/blobs/')
+    size = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256} ({self.ref_count} references)"
+
 class LessonResource(models.Model):
     RESOURCE_TYPES = [
         ('document', 'Document'),
@@ -194,8 +244,33 @@ class LessonResource(models.Model):
     allow_preview = models.BooleanField(default=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='resources')
+    blob = models.ForeignKey(
+        ResourceBlob, null=True, blank=True, on_delete=models.PROTECT, related_name='resources'
+    )
+    # Recorded at upload so serving and listings need no stat or read.
+    size = models.PositiveBigIntegerField(null=True, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    sha256 = models.CharField(max_length=64, blank=True)
+    modified_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['lesson', 'uploaded_at', 'id'], name='resource_lesson_uploaded_idx'),
+        ]
 
     def save(self, *args, **kwargs):
+        self.set_resource_type()
+
+        if self.file and self.size is None:
+            try:
+                self.set_file_metadata()
+            except FileNotFoundError:
+                # Left for backfill_resource_metadata; serving stats the file meanwhile.
+                pass
+        
+        super().save(*args, **kwargs)
+
+    def set_resource_type(self):
         extension = self.file.name.split('.')[-1].lower()
         if extension in ['pdf', 'docx', 'pptx']:
             self.resource_type = 'document'
@@ -203,16 +278,76 @@ class LessonResource(models.Model):
             self.resource_type = 'image'
         else:
             self.resource_type = 'other'
-        
-        super().save(*args, **kwargs)
+
+    def set_file_metadata(self, modified_at=None):
+        if self.blob_id:
+            self.size, self.sha256 = self.blob.size, self.blob.sha256
+        else:
+            sha256 = hashlib.sha256()
+            for chunk in self.file.chunks():
+                sha256.update(chunk)
+            self.size, self.sha256 = self.file.size, sha256.hexdigest()
+        self.content_type = mimetypes.guess_type(self.file.name)[0] or 'application/octet-stream'
+        self.modified_at = modified_at or timezone.now()
 
     def __str__(self):
         return f"{self.title} - {os.path.basename(self.file.name)}"
 
+class ResourceDerivative(models.Model):
+    # Downscaled renderings of an image or PDF resource, made in the background
+    # after upload and preferred by the preview endpoint when they are smaller.
+    KINDS = [
+        ('thumbnail', 'Thumbnail'),
+        ('thumbnail_webp', 'Thumbnail (WebP)'),
+        ('display', 'Display'),
+        ('display_webp', 'Display (WebP)'),
+    ]
+
+    resource = models.ForeignKey(LessonResource, on_delete=models.CASCADE, related_name='derivatives')
+    kind = models.CharField(max_length=20, choices=KINDS)
+    file = models.FileField(upload_to='lesson_resources/')
+    content_type = models.CharField(max_length=50)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    size = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['resource', 'kind'], name='unique_resource_derivative_kind'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} of resource {self.resource_id} ({self.width}x{self.height})"
+
+class ResourceUploadSession(models.Model):
+    # A resumable upload: chunks are appended to a part file until `received`
+    # reaches `size`, then the file becomes a LessonResource of `lesson`.
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='upload_sessions')
+    created_by = models.ForeignKey(AppUser, on_delete=models.CASCADE, related_name='upload_sessions')
+    title = models.CharField(max_length=35)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    sha256 = models.CharField(max_length=64, blank=True)
+    received = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size} bytes)"
+
 class CourseProgress(models.Model):
     user = models.ForeignKey(AppUser, on_delete=models.CASCADE)
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
     progress_percentage = models.FloatField(default=0.0, null=False, blank=False) 
+    completed_lessons = models.PositiveIntegerField(default=0)
+    total_lessons = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'course'], name='unique_course_progress_per_user'),
+        ]
 
     def __str__(self):
         return f"{self.user.name} - {self.course.title} - {self.progress_percentage}%"
@@ -222,14 +357,56 @@ class LessonProgress(models.Model):
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE)
     completed = models.BooleanField(default=False)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'lesson'], name='unique_lesson_progress_per_user'),
+        ]
+
     def __str__(self):
         return f"{self.user.name} - {self.lesson.title} - {'Completed' if self.completed else 'Not Completed'}"
 
+# Histogram buckets over CourseProgress.progress_percentage: (field, low, high),
+# low inclusive and high exclusive, with 0% and 100% kept as buckets of their own.
+PROGRESS_HISTOGRAM_BUCKETS = [
+    ('not_started_count', 0, 0),
+    ('progress_0_25_count', 0, 25),
+    ('progress_25_50_count', 25, 50),
+    ('progress_50_75_count', 50, 75),
+    ('progress_75_100_count', 75, 100),
+    ('completed_count', 100, 100),
+]
+
+class CourseStats(models.Model):
+    # Signed counters: a missed delta shows up as drift for rebuild_course_stats
+    # to repair instead of failing the learner's write.
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    enrolled_count = models.IntegerField(default=0)
+    progress_total = models.FloatField(default=0.0)
+    not_started_count = models.IntegerField(default=0)
+    progress_0_25_count = models.IntegerField(default=0)
+    progress_25_50_count = models.IntegerField(default=0)
+    progress_50_75_count = models.IntegerField(default=0)
+    progress_75_100_count = models.IntegerField(default=0)
+    completed_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def tracked_count(self):
+        return sum(getattr(self, field) for field, _, _ in PROGRESS_HISTOGRAM_BUCKETS)
+
+    @property
+    def average_progress(self):
+        tracked = self.tracked_count
+        return self.progress_total / tracked if tracked else 0.0
+
+    def __str__(self):
+        return f"{self.course_id} - {self.enrolled_count} enrolled"
+
 class Event(models.Model):
     event_id = models.AutoField(primary_key=True)
     title = models.CharField(max_length=50, null=False, blank=False)
     description = models.TextField(null=True, blank=True)
-    start_time = models.DateTimeField(null=False, blank=False)
+    start_time = models.DateTimeField(null=False, blank=False, db_index=True)
     end_time = models.DateTimeField(null=False, blank=False)
 
     def clean(self):
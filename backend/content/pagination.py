@@ -0,0 +1,79 @@
+from bisect import bisect_left, bisect_right
+
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class ContentCursorPagination(CursorPagination):
+    page_size = settings.CONTENT_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.CONTENT_MAX_PAGE_SIZE
+    ordering = ('pk',)
+
+
+def course_title_key(course):
+    # Order of the catalog snapshot. Case-insensitive like MySQL's collation,
+    # so the list stays sorted under the key the cursors bisect on.
+    return course['title'].casefold(), course['course_id']
+
+
+class CourseTitlePagination(ContentCursorPagination):
+    ordering = ('title', 'course_id')
+
+    def paginate_snapshot(self, courses, request):
+        # Same cursors as paginate_queryset, but walked over an already
+        # serialized course list, sorted by course_title_key, with bisect
+        # instead of a query. Snapshot positions are casefolded titles.
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, position = self.cursor or (0, False, None)
+
+        titles = [course_title_key(course)[0] for course in courses]
+        position = position.casefold() if position is not None else None
+        if reverse:
+            end = (bisect_left(titles, position) if position is not None else len(titles)) - offset
+            start = max(end - self.page_size, 0)
+        else:
+            start = (bisect_right(titles, position) if position is not None else 0) + offset
+            end = start + self.page_size
+        self.page = courses[start:max(end, 0)]
+
+        if reverse:
+            self.has_next = position is not None or offset > 0
+            self.next_position = position
+            self.has_previous = start > 0
+            self.previous_position = titles[start - 1] if self.has_previous else None
+        else:
+            self.has_next = end < len(courses)
+            self.next_position = titles[end] if self.has_next else None
+            self.has_previous = position is not None or offset > 0
+            self.previous_position = position
+
+        return self.page
+
+    def _get_position_from_instance(self, instance, ordering):
+        if isinstance(instance, dict):
+            return course_title_key(instance)[0]
+        return super()._get_position_from_instance(instance, ordering)
+
+
+class CourseSearchPagination(ContentCursorPagination):
+    ordering = ('-relevance', 'course_id')
+
+
+class CourseCreatedPagination(ContentCursorPagination):
+    ordering = ('-created_at', '-course_id')
+
+
+class DashboardPagination(ContentCursorPagination):
+    ordering = ('course_title', 'id')
+
+
+class EventStartPagination(ContentCursorPagination):
+    ordering = ('start_time', 'event_id')
+
+
+class ResourceUploadedPagination(ContentCursorPagination):
+    ordering = ('uploaded_at', 'id')
@@ -0,0 +1,62 @@
+from django.db import connection
+from django.db.models import Case, Count, F, FloatField, Func, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import DIFFICULTY_LEVELS, Course, Lesson
+
+COURSE_SEARCH_FIELDS = ('title', 'description', 'level')
+LESSON_SEARCH_FIELDS = ('title', 'description')
+# A lesson hit counts for less than a hit on the course itself.
+LESSON_RELEVANCE_WEIGHT = 0.5
+
+
+class MatchAgainst(Func):
+    # Column list must match a FULLTEXT index exactly (see migration 0015).
+    output_field = FloatField()
+
+    def __init__(self, *fields, query):
+        self.query = query
+        super().__init__(*[F(field) for field in fields])
+
+    def as_mysql(self, compiler, connection):
+        sql, params = self.as_sql(
+            compiler, connection, template='MATCH (%(expressions)s) AGAINST (%%s IN NATURAL LANGUAGE MODE)'
+        )
+        return sql, (*params, self.query)
+
+
+def relevance(fields, query):
+    if connection.vendor == 'mysql':
+        return MatchAgainst(*fields, query=query)
+
+    # No FULLTEXT outside MySQL: score one point per field containing the query.
+    score = Value(0.0)
+    for field in fields:
+        score = score + Case(
+            When(**{f'{field}__icontains': query}, then=Value(1.0)),
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+    return score
+
+
+def search_courses(query, queryset=None):
+    queryset = Course.objects.all() if queryset is None else queryset
+
+    lessons = Lesson.objects.annotate(score=relevance(LESSON_SEARCH_FIELDS, query)).filter(score__gt=0)
+    matching_courses = Course.objects.annotate(score=relevance(COURSE_SEARCH_FIELDS, query)).filter(score__gt=0)
+    best_lesson_score = lessons.filter(course=OuterRef('pk')).order_by('-score').values('score')[:1]
+
+    # Each id subquery is answered from its own FULLTEXT index; scores are only
+    # computed for the rows that survive.
+    return queryset.filter(
+        Q(pk__in=matching_courses.values('pk')) | Q(pk__in=lessons.values('course_id'))
+    ).annotate(
+        relevance=relevance(COURSE_SEARCH_FIELDS, query)
+        + Coalesce(Subquery(best_lesson_score), Value(0.0)) * LESSON_RELEVANCE_WEIGHT
+    )
+
+
+def level_facets(queryset):
+    counts = dict(queryset.order_by().values_list('level').annotate(count=Count('pk')))
+    return {level: counts.get(level, 0) for level, _ in DIFFICULTY_LEVELS}
@@ -1,13 +1,21 @@
 # serializers.py
+import os
+import re
+
+from django.conf import settings
 from rest_framework import serializers
+from .blobs import create_lesson_resources
 from .models import (
+    PROGRESS_HISTOGRAM_BUCKETS,
     CourseProgress,
+    CourseStats,
     LessonProgress,
     Lesson,  
     Course,
     Enrollment,  
     Event,   
     LessonResource,  
+    ResourceUploadSession,
     AppUser
 )
 
@@ -105,6 +113,12 @@ class CourseSerializer(serializers.ModelSerializer):
             
         return data
 
+class CourseSearchSerializer(CourseSerializer):
+    relevance = serializers.FloatField(read_only=True)
+
+    class Meta(CourseSerializer.Meta):
+        fields = CourseSerializer.Meta.fields + ['relevance']
+
 class EnrollmentSerializer(serializers.ModelSerializer):
     course = CourseSerializer(read_only=True)
     
@@ -113,29 +127,92 @@ class EnrollmentSerializer(serializers.ModelSerializer):
         fields = ['id', 'course', 'enrollment_date']
         read_only_fields = ['enrollment_date']
 
+class NextLessonSerializer(serializers.ModelSerializer):
+    order = serializers.IntegerField(source='display_order')
+
+    class Meta:
+        model = Lesson
+        fields = ['lesson_id', 'title', 'order']
+
+class DashboardEnrollmentSerializer(serializers.ModelSerializer):
+    course = CourseSerializer(read_only=True)
+    progress_percentage = serializers.FloatField(read_only=True)
+    completed_lessons = serializers.IntegerField(read_only=True)
+    total_lessons = serializers.IntegerField(read_only=True)
+    next_lesson = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Enrollment
+        fields = [
+            'id',
+            'course',
+            'enrollment_date',
+            'progress_percentage',
+            'completed_lessons',
+            'total_lessons',
+            'next_lesson'
+        ]
+
+    def get_next_lesson(self, obj):
+        lesson = self.context['next_lessons'].get(obj.course_id)
+        return NextLessonSerializer(lesson).data if lesson else None
+
 class EventSerializer(serializers.ModelSerializer):  
     class Meta:
         model = Event  
         fields = ['event_id', 'title', 'description', 'start_time', 'end_time']
 
 
+class CohortEnrollmentSerializer(serializers.Serializer):
+    emails = serializers.ListField(child=serializers.EmailField(), required=False, default=list)
+    user_ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+
+    def validate(self, data):
+        if not data['emails'] and not data['user_ids']:
+            raise serializers.ValidationError("Provide at least one email or user ID.")
+        data['emails'] = list(dict.fromkeys(data['emails']))
+        data['user_ids'] = list(dict.fromkeys(data['user_ids']))
+        return data
+
 class CourseProgressSerializer(serializers.ModelSerializer):
     course = CourseSerializer(read_only=True)
     user = UserSerializer(read_only=True)
 
     class Meta:
         model = CourseProgress
-        fields = ['course', 'user', 'progress_percentage']  
+        fields = ['course', 'user', 'progress_percentage', 'completed_lessons', 'total_lessons']  
+
+class CourseStatsSerializer(serializers.ModelSerializer):
+    average_progress = serializers.FloatField(read_only=True)
+    histogram = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CourseStats
+        fields = ['course_id', 'enrolled_count', 'completed_count', 'average_progress', 'histogram', 'updated_at']
+
+    def get_histogram(self, obj):
+        return {field.removesuffix('_count'): getattr(obj, field) for field, _, _ in PROGRESS_HISTOGRAM_BUCKETS}
 
 class LessonProgressSerializer(serializers.ModelSerializer):
     class Meta:
         model = LessonProgress
         fields = ['id', 'user', 'lesson', 'completed']
 
+class LessonProgressEntrySerializer(serializers.Serializer):
+    lesson_id = serializers.IntegerField()
+    completed = serializers.BooleanField()
+
+class BulkLessonProgressSerializer(serializers.Serializer):
+    lessons = LessonProgressEntrySerializer(many=True, allow_empty=False)
+
 class LessonSerializer(serializers.ModelSerializer):
     completed = serializers.SerializerMethodField()  
+    order = serializers.IntegerField(source='display_order')
 
     def get_completed(self, obj):
+        completed_lesson_ids = self.context.get('completed_lesson_ids')
+        if completed_lesson_ids is not None:
+            return obj.lesson_id in completed_lesson_ids
         user = self.context['request'].user
         return LessonProgress.objects.filter(user=user, lesson=obj, completed=True).exists()
     
@@ -144,21 +221,44 @@ class LessonSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Order must be a positive number.")
         return value
 
+    def create(self, validated_data):
+        display_order = validated_data.pop('display_order')
+        lesson = super().create(validated_data)
+        lesson.display_order = display_order
+        return lesson
+
     class Meta:
         model = Lesson
         fields = ['lesson_id', 'course', 'title', 'description', 'order', 'completed']
         extra_kwargs = {
             'title': {'required': True},
             'description': {'required': True},
-            'order': {'required': True},
         }
 
+class LessonReorderSerializer(serializers.Serializer):
+    lessons = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+
+    def validate_lessons(self, value):
+        if len(set(value)) != len(value):
+            raise serializers.ValidationError("Each lesson may only appear once.")
+        return value
+
 class LessonResourceSerializer(serializers.ModelSerializer):
     class Meta:
         model = LessonResource
         fields = ['id', 'title', 'file', 'resource_type', 'allow_preview', 
-                 'uploaded_at', 'lesson']
-        read_only_fields = ['uploaded_at', 'resource_type']
+                 'uploaded_at', 'lesson', 'size', 'content_type']
+        read_only_fields = ['uploaded_at', 'resource_type', 'size', 'content_type']
+
+RESOURCE_EXTENSIONS = ['pdf', 'docx', 'pptx', 'jpg', 'jpeg', 'png']
+
+
+def validate_resource_extension(filename):
+    if filename.split('.')[-1].lower() not in RESOURCE_EXTENSIONS:
+        raise serializers.ValidationError(
+            f'Unsupported file type. Allowed types: {", ".join(RESOURCE_EXTENSIONS)}'
+        )
+
 
 class LessonResourceBulkSerializer(serializers.Serializer):
     lesson = serializers.PrimaryKeyRelatedField(queryset=Lesson.objects.all())
@@ -179,17 +279,13 @@ class LessonResourceBulkSerializer(serializers.Serializer):
             raise serializers.ValidationError("Number of titles must match number of files")
         
         max_size_mb = 10
-        allowed_extensions = ['pdf', 'docx', 'pptx','jpg', 'jpeg', 'png']
 
         for file in data['resources']:
             if file.size > max_size_mb * 1024 * 1024:
-                raise serializers.ValidationError(f'File size should not exceed {max_size_mb} MB.')
-
-            file_extension = file.name.split('.')[-1].lower()
-            if file_extension not in allowed_extensions:
                 raise serializers.ValidationError(
-                    f'Unsupported file type. Allowed types: {", ".join(allowed_extensions)}'
+                    f'File size should not exceed {max_size_mb} MB. Use a resumable upload for larger files.'
                 )
+            validate_resource_extension(file.name)
 
         return data
 
@@ -198,14 +294,28 @@ class LessonResourceBulkSerializer(serializers.Serializer):
         resources = validated_data['resources']
         titles = validated_data['titles']
         
-        created_resources = []
-        
-        for file, title in zip(resources, titles):
-            resource = LessonResource.objects.create(
-                lesson=lesson,
-                file=file,
-                title=title
+        return create_lesson_resources(lesson, list(zip(titles, resources)))
+
+
+class ResourceUploadSessionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ResourceUploadSession
+        fields = ['id', 'lesson', 'title', 'filename', 'size', 'sha256', 'received', 'created_at']
+        read_only_fields = ['id', 'received', 'created_at']
+
+    def validate_filename(self, value):
+        validate_resource_extension(value)
+        return os.path.basename(value)
+
+    def validate_size(self, value):
+        if not 0 < value <= settings.RESOURCE_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f'File size should be between 1 byte and {settings.RESOURCE_UPLOAD_MAX_SIZE // (1024 * 1024)} MB.'
             )
-            created_resources.append(resource)
-            
-        return created_resources
\ No newline at end of file
+        return value
+
+    def validate_sha256(self, value):
+        value = value.lower()
+        if value and not re.fullmatch(r'[0-9a-f]{64}', value):
+            raise serializers.ValidationError('Expected a hex sha256 digest.')
+        return value
@@ -0,0 +1,223 @@
+import mimetypes
+import os
+import re
+import uuid
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+RANGE_RE = re.compile(r'^\s*(\d*)\s*-\s*(\d*)\s*$')
+# More ranges than this, or overlapping ones, get the whole file instead.
+MAX_RANGES = 16
+CHUNK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range_header(header, size):
+    """Return a list of inclusive (start, end) byte ranges, or None to send the whole file."""
+    if not header or not header.startswith('bytes='):
+        return None
+
+    ranges = []
+    for spec in header[len('bytes='):].split(','):
+        match = RANGE_RE.match(spec)
+        if not match or match.groups() == ('', ''):
+            return None
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+            if last and int(last) < start:
+                return None
+        else:
+            # Suffix range: the last N bytes.
+            start = max(size - int(last), 0)
+            end = size - 1
+        if start < size and start <= end:
+            ranges.append((start, end))
+
+    if not ranges:
+        raise RangeNotSatisfiable
+    ordered = sorted(ranges)
+    if len(ranges) > MAX_RANGES or any(ordered[i][1] >= ordered[i + 1][0] for i in range(len(ordered) - 1)):
+        return None
+    return ranges
+
+
+def read_range(handle, start, end):
+    handle.seek(start)
+    remaining = end - start + 1
+    while remaining > 0:
+        chunk = handle.read(min(CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        yield chunk
+
+
+def read_multipart_ranges(handle, ranges, parts, boundary):
+    for (start, end), part in zip(ranges, parts):
+        yield part
+        yield from read_range(handle, start, end)
+    yield f'\r\n--{boundary}--\r\n'.encode()
+
+
+def accel_redirect_response(name, content_type):
+    # nginx serves the bytes (and any Range) from its internal location.
+    response = HttpResponse(content_type=content_type)
+    response['X-Accel-Redirect'] = settings.RESOURCE_ACCEL_REDIRECT_PREFIX + quote(name)
+    return response
+
+
+class FileChunks:
+    """Response body over an open file; Django calls close() with the response, even if never read."""
+
+    def __init__(self, handle, chunks):
+        self.handle = handle
+        self.chunks = chunks
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+    def close(self):
+        self.handle.close()
+
+
+def streaming_response(handle, ranges, size, content_type):
+    if ranges is None:
+        response = StreamingHttpResponse(
+            FileChunks(handle, read_range(handle, 0, size - 1)), content_type=content_type
+        )
+        response['Content-Length'] = size
+    elif len(ranges) == 1:
+        start, end = ranges[0]
+        response = StreamingHttpResponse(
+            FileChunks(handle, read_range(handle, start, end)), status=206, content_type=content_type
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    else:
+        boundary = uuid.uuid4().hex
+        parts = [
+            (
+                f'\r\n--{boundary}\r\n'
+                f'Content-Type: {content_type}\r\n'
+                f'Content-Range: bytes {start}-{end}/{size}\r\n\r\n'
+            ).encode()
+            for start, end in ranges
+        ]
+        response = StreamingHttpResponse(
+            FileChunks(handle, read_multipart_ranges(handle, ranges, parts, boundary)),
+            status=206,
+            content_type=f'multipart/byteranges; boundary={boundary}'
+        )
+        response['Content-Length'] = (
+            sum(len(part) for part in parts)
+            + sum(end - start + 1 for start, end in ranges)
+            + len(f'\r\n--{boundary}--\r\n')
+        )
+    return response
+
+
+def file_metadata(path):
+    stat = os.stat(path)
+    return {
+        'size': stat.st_size,
+        'content_type': mimetypes.guess_type(path)[0] or 'application/octet-stream',
+        'last_modified': stat.st_mtime,
+        'etag': None,
+    }
+
+
+def file_response(request, path, metadata=None):
+    """Serve `path`; with known `metadata` HEAD and conditional requests never touch the disk."""
+    metadata = metadata or file_metadata(path)
+    size, content_type, etag = metadata['size'], metadata['content_type'], metadata['etag']
+    last_modified = http_date(metadata['last_modified'])
+
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=int(metadata['last_modified'])
+    )
+    if not_modified is not None:
+        return not_modified
+
+    ranges = None
+    if_range = request.headers.get('If-Range')
+    if (
+        not if_range
+        or (etag and if_range == etag)
+        or parse_http_date_safe(if_range) == parse_http_date_safe(last_modified)
+    ):
+        try:
+            ranges = parse_range_header(request.headers.get('Range'), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+        response['Content-Length'] = size
+    else:
+        response = streaming_response(open(path, 'rb'), ranges, size, content_type)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['Last-Modified'] = last_modified
+    if etag:
+        response['ETag'] = etag
+    return response
+
+
+def serve_file(request, file, download_filename=None, metadata=None):
+    if settings.RESOURCE_SERVE_MODE == 'accel':
+        if metadata:
+            not_modified = get_conditional_response(
+                request, etag=metadata['etag'], last_modified=int(metadata['last_modified'])
+            )
+            if not_modified is not None:
+                return not_modified
+        content_type = metadata['content_type'] if metadata else None
+        response = accel_redirect_response(
+            file.name, content_type or mimetypes.guess_type(file.name)[0] or 'application/octet-stream'
+        )
+    else:
+        response = file_response(request, file.path, metadata)
+
+    if download_filename and response.status_code in (200, 206):
+        response['Content-Disposition'] = f'attachment; filename="{download_filename}"'
+    return response
+
+
+def resource_metadata(resource):
+    # Rows uploaded before metadata was recorded fall back to a stat.
+    if resource.size is None:
+        return None
+    return {
+        'size': resource.size,
+        'content_type': resource.content_type,
+        'last_modified': resource.modified_at.timestamp(),
+        'etag': f'"{resource.sha256}"',
+    }
+
+
+def derivative_metadata(derivative):
+    return {
+        'size': derivative.size,
+        'content_type': derivative.content_type,
+        'last_modified': derivative.created_at.timestamp(),
+        'etag': None,
+    }
+
+
+def serve_resource_file(request, resource, download_filename=None):
+    return serve_file(request, resource.file, download_filename, resource_metadata(resource))
+
+
+def serve_derivative_file(request, derivative):
+    return serve_file(request, derivative.file, metadata=derivative_metadata(derivative))
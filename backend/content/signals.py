@@ -0,0 +1,43 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .catalog import bump_catalog_version, bump_learner_version
+from .models import Course, CourseStats, Enrollment, Lesson, LessonProgress
+from .stats import apply_stats_deltas, stats_deltas
+
+
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=Lesson)
+def invalidate_catalog(sender, **kwargs):
+    # Bump only once the write is visible, so a concurrent rebuild cannot
+    # cache the old rows under the new version.
+    transaction.on_commit(bump_catalog_version)
+
+
+# post_save only: a post_delete receiver would turn off fast deletes, so a
+# removed course would fetch and delete its enrollments and progress row by
+# row. The admin delete views bump those learners once instead.
+@receiver(post_save, sender=Enrollment)
+@receiver(post_save, sender=LessonProgress)
+def invalidate_learner(sender, instance, **kwargs):
+    transaction.on_commit(partial(bump_learner_version, instance.user_id))
+
+
+@receiver(post_save, sender=Course)
+def create_course_stats(sender, instance, created, **kwargs):
+    if created:
+        CourseStats.objects.create(course=instance)
+
+
+# Deletes are left out on purpose: they arrive as per-row cascades from a course
+# (whose stats row goes with it) or a user, and a handler here would turn each
+# cascade into one UPDATE per row. rebuild_course_stats repairs user removals.
+@receiver(post_save, sender=Enrollment)
+def count_enrollment(sender, instance, created, **kwargs):
+    if created:
+        deltas = stats_deltas()
+        deltas[instance.course_id]['enrolled_count'] += 1
+        apply_stats_deltas(deltas)
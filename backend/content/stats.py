@@ -0,0 +1,96 @@
+from collections import Counter, defaultdict
+
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import PROGRESS_HISTOGRAM_BUCKETS, Course, CourseProgress, CourseStats, Enrollment
+
+
+def progress_bucket(percentage):
+    for field, low, high in PROGRESS_HISTOGRAM_BUCKETS:
+        if low == high == percentage or low <= percentage < high:
+            return field
+    return PROGRESS_HISTOGRAM_BUCKETS[-1][0]
+
+
+def bucket_filter(low, high):
+    field = 'progress_percentage'
+    if low == high:
+        return Q(**{field: low}) if low == 0 else Q(**{f'{field}__gte': low})
+    return Q(**{f'{field}__gte': low, f'{field}__lt': high}) & ~Q(**{field: 0})
+
+
+def stats_deltas():
+    return defaultdict(Counter)
+
+
+def add_progress_change(deltas, course_id, old=None, new=None):
+    # old/new are progress percentages; None means the learner has no
+    # CourseProgress row on that side of the change.
+    if old is not None:
+        deltas[course_id][progress_bucket(old)] -= 1
+        deltas[course_id]['progress_total'] -= old
+    if new is not None:
+        deltas[course_id][progress_bucket(new)] += 1
+        deltas[course_id]['progress_total'] += new
+
+
+def apply_stats_deltas(deltas):
+    # One UPDATE for every course touched; each counter moves by its own delta
+    # so concurrent writers never overwrite each other. update() skips
+    # auto_now, so updated_at is set here.
+    deltas = {course_id: counter for course_id, counter in deltas.items() if any(counter.values())}
+    if not deltas:
+        return
+    fields = {field for counter in deltas.values() for field, delta in counter.items() if delta}
+    CourseStats.objects.filter(course_id__in=deltas.keys()).update(**{
+        field: Case(
+            *[When(course_id=course_id, then=F(field) + Value(counter[field]))
+              for course_id, counter in deltas.items() if counter[field]],
+            default=F(field),
+        )
+        for field in fields
+    }, updated_at=timezone.now())
+
+
+def rebuild_course_stats(course_ids=None):
+    courses = Course.objects.all()
+    if course_ids is not None:
+        courses = courses.filter(course_id__in=course_ids)
+    course_ids = list(courses.values_list('course_id', flat=True))
+
+    enrolled = dict(
+        Enrollment.objects.filter(course_id__in=course_ids)
+        .values('course_id').annotate(count=Count('id')).values_list('course_id', 'count')
+    )
+    progress = {
+        row.pop('course_id'): row
+        for row in CourseProgress.objects.filter(course_id__in=course_ids).values('course_id').annotate(
+            progress_total=Coalesce(Sum('progress_percentage'), 0.0),
+            **{
+                field: Count('id', filter=bucket_filter(low, high))
+                for field, low, high in PROGRESS_HISTOGRAM_BUCKETS
+            }
+        )
+    }
+
+    now = timezone.now()
+    stats = [
+        CourseStats(
+            course_id=course_id,
+            enrolled_count=enrolled.get(course_id, 0),
+            updated_at=now,
+            **progress.get(course_id, {})
+        )
+        for course_id in course_ids
+    ]
+    CourseStats.objects.bulk_create(
+        [CourseStats(course_id=course_id) for course_id in course_ids], ignore_conflicts=True
+    )
+    CourseStats.objects.bulk_update(
+        stats,
+        ['enrolled_count', 'progress_total', 'updated_at'] + [field for field, _, _ in PROGRESS_HISTOGRAM_BUCKETS],
+        batch_size=500
+    )
+    return len(stats)
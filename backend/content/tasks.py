@@ -0,0 +1,25 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='content-tasks')
+
+
+def _run(func, args, kwargs):
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception("Background task %s failed", func.__name__)
+    finally:
+        connections.close_all()
+
+
+def run_in_background(func, *args, **kwargs):
+    return _executor.submit(_run, func, args, kwargs)
+
+
+def run_on_commit(func, *args, **kwargs):
+    transaction.on_commit(lambda: run_in_background(func, *args, **kwargs))
@@ -1,3 +1,1380 @@
-from django.test import TestCase
+import fcntl
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from concurrent.futures import Future
+from unittest import mock
 
-# Create your tests here.
+import pypdfium2
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from PIL import Image
+
+from .blobs import create_lesson_resources, purge_orphan_files
+from .catalog import bump_learner_version, get_catalog_version, get_learner_version
+from .derivatives import generate_derivatives, pick_preview
+from .serving import streaming_response
+from .stats import rebuild_course_stats
+from .utils import recompute_course_progress, respace_lesson_ranks, sweep_visibility_transitions
+
+from .models import (
+    LESSON_RANK_GAP,
+    PROGRESS_HISTOGRAM_BUCKETS,
+    AppUser,
+    Course,
+    CourseProgress,
+    CourseStats,
+    EmailVerificationToken,
+    Enrollment,
+    Event,
+    Lesson,
+    LessonProgress,
+    LessonResource,
+    ResourceBlob,
+    ResourceUploadSession,
+)
+
+COURSES = 12
+LESSONS_PER_COURSE = 8
+RESOURCES_PER_LESSON = 3
+LEARNERS = 15
+EVENTS = 10
+
+
+class InlineExecutor:
+    """Stands in for the derivative process pool; test runner workers cannot have children."""
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class ContentTestMixin:
+    """Runs each class against its own MEDIA_ROOT, removed once the class is done."""
+
+    @classmethod
+    def setUpClass(cls):
+        media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        test_settings = override_settings(
+            MEDIA_ROOT=media_root,
+            PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+        )
+        test_settings.enable()
+        cls.addClassCleanup(test_settings.disable)
+        pool = mock.patch('content.derivatives.get_pool', return_value=InlineExecutor())
+        pool.start()
+        cls.addClassCleanup(pool.stop)
+        super().setUpClass()
+
+    @classmethod
+    def create_users(cls):
+        cls.admin = AppUser.objects.create_user(
+            'admin@example.com', 'Test Admin', password='AdminPass123!', role='admin', is_verified=True
+        )
+        cls.learner = AppUser.objects.create_user(
+            'learner@example.com', 'Test Learner', password='LearnerPass123!', is_verified=True
+        )
+
+    @classmethod
+    def create_course_fixture(cls, lessons=1):
+        """An admin teaching one visible course of `lessons` ranked lessons, and a learner."""
+        cls.create_users()
+        cls.course = Course.objects.create(
+            title='Solar Basics',
+            description='Panels and inverters.',
+            duration='2 weeks',
+            instructor=cls.admin,
+            is_visible=True,
+        )
+        cls.lessons = [
+            Lesson.objects.create(
+                course=cls.course, title=f'Lesson {position}', description='x', rank=position * LESSON_RANK_GAP
+            )
+            for position in range(1, lessons + 1)
+        ]
+        cls.lesson = cls.lessons[0]
+
+
+class ContentTestCase(ContentTestMixin, TestCase):
+    pass
+
+
+class QueryBudgetTests(ContentTestCase):
+    """Every route in content/urls.py must stay within a fixed query budget.
+
+    The fixtures hold enough courses, lessons, resources and learners that a
+    per-row query would blow the budget, so an N+1 regression fails here.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_users()
+        AppUser.objects.bulk_create([
+            AppUser(email=f'learner{index}@example.com', name=f'Learner {index}', is_verified=True)
+            for index in range(LEARNERS)
+        ])
+        learners = list(AppUser.objects.filter(role='user').exclude(pk=cls.learner.pk))
+
+        for index in range(COURSES):
+            Course.objects.create(
+                title=f'Course {index:02d}',
+                description='A course about renewable energy.',
+                duration='4 weeks',
+                instructor=cls.admin,
+                is_visible=True,
+            )
+        cls.courses = list(Course.objects.order_by('title'))
+        cls.course = cls.courses[0]
+
+        Lesson.objects.bulk_create([
+            Lesson(
+                course=course,
+                title=f'Lesson {position}',
+                description='Lesson description.',
+                rank=position * LESSON_RANK_GAP,
+            )
+            for course in cls.courses
+            for position in range(1, LESSONS_PER_COURSE + 1)
+        ])
+        cls.lessons = list(Lesson.objects.filter(course=cls.course).order_by('rank'))
+        cls.lesson = cls.lessons[0]
+
+        for lesson in Lesson.objects.filter(course__in=cls.courses[:2]):
+            for index in range(RESOURCES_PER_LESSON):
+                LessonResource.objects.create(
+                    lesson=lesson,
+                    title=f'Notes {index}',
+                    file=SimpleUploadedFile(f'notes{index}.pdf', b'%PDF-1.4 lesson notes'),
+                )
+        cls.resource = LessonResource.objects.filter(lesson=cls.lesson).first()
+        # Tests that delete files work on the second course so the first one's
+        # files stay on disk for the preview and download tests.
+        cls.disposable_course = cls.courses[1]
+
+        Enrollment.objects.bulk_create([
+            Enrollment(user=learner, course=course)
+            for learner in learners
+            for course in cls.courses[:COURSES // 2]
+        ])
+        CourseProgress.objects.bulk_create([
+            CourseProgress(user=learner, course=course, total_lessons=LESSONS_PER_COURSE)
+            for learner in learners
+            for course in cls.courses[:COURSES // 2]
+        ])
+        Enrollment.objects.create(user=cls.learner, course=cls.course)
+        CourseProgress.objects.create(
+            user=cls.learner,
+            course=cls.course,
+            completed_lessons=LESSONS_PER_COURSE // 2,
+            total_lessons=LESSONS_PER_COURSE,
+            progress_percentage=50.0
+        )
+        LessonProgress.objects.bulk_create([
+            LessonProgress(user=cls.learner, lesson=lesson, completed=True)
+            for lesson in cls.lessons[:LESSONS_PER_COURSE // 2]
+        ])
+
+        now = timezone.now()
+        Event.objects.bulk_create([
+            Event(
+                title=f'Event {index}',
+                start_time=now + timezone.timedelta(days=index),
+                end_time=now + timezone.timedelta(days=index, hours=2),
+            )
+            for index in range(EVENTS)
+        ])
+        rebuild_course_stats()
+
+    def setUp(self):
+        cache.clear()
+        self.admin_client = APIClient()
+        self.admin_client.force_authenticate(self.admin)
+        self.learner_client = APIClient()
+        self.learner_client.force_authenticate(self.learner)
+        self.anonymous_client = APIClient()
+
+    def assertQueryBudget(self, budget, call, *args, **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            response = call(*args, **kwargs)
+        self.assertLess(response.status_code, 400, getattr(response, 'data', response))
+        self.assertLessEqual(
+            len(context.captured_queries),
+            budget,
+            '\n'.join(query['sql'] for query in context.captured_queries)
+        )
+        return response
+
+    def get_bundle(self, url):
+        # The archive is built while it streams, so its queries only run once it is read.
+        response = self.learner_client.get(url)
+        response.archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        return response
+
+    # Admin endpoints
+
+    def test_admin_users(self):
+        response = self.assertQueryBudget(1, self.admin_client.get, reverse('admin-users'))
+        self.assertEqual(len(response.data['results']), LEARNERS + 2)
+
+    def test_admin_list_courses(self):
+        response = self.assertQueryBudget(1, self.admin_client.get, reverse('admin-list-courses'))
+        self.assertEqual(len(response.data['results']), COURSES)
+
+    def test_admin_add_course(self):
+        self.assertQueryBudget(3, self.admin_client.post, reverse('admin-add-course'), {
+            'title': 'New Course',
+            'description': 'Fresh material.',
+            'duration': '2 weeks',
+            'level': 'Beginner',
+        }, format='json')
+
+    def test_admin_remove_course(self):
+        self.assertQueryBudget(
+            20, self.admin_client.delete,
+            reverse('admin-remove-course', args=[self.disposable_course.course_id])
+        )
+        self.assertFalse(Lesson.objects.filter(course=self.disposable_course).exists())
+
+    def test_admin_course_stats(self):
+        response = self.assertQueryBudget(1, self.admin_client.get, reverse('admin-course-stats'))
+        self.assertEqual(len(response.data['results']), COURSES)
+        stats = response.data['results'][0]
+        self.assertEqual(stats['enrolled_count'], LEARNERS + 1)
+        self.assertEqual(stats['histogram']['not_started'], LEARNERS)
+        self.assertEqual(stats['histogram']['progress_50_75'], 1)
+
+    def test_admin_list_events(self):
+        response = self.assertQueryBudget(1, self.admin_client.get, reverse('admin-list-events'))
+        self.assertEqual(len(response.data['results']), EVENTS)
+
+    def test_admin_add_event(self):
+        now = timezone.now()
+        self.assertQueryBudget(1, self.admin_client.post, reverse('admin-add-event'), {
+            'title': 'Workshop',
+            'start_time': now.isoformat(),
+            'end_time': (now + timezone.timedelta(hours=1)).isoformat(),
+        }, format='json')
+
+    def test_admin_remove_event(self):
+        event = Event.objects.first()
+        self.assertQueryBudget(2, self.admin_client.delete, reverse('admin-remove-event', args=[event.event_id]))
+
+    def test_admin_add_lesson(self):
+        response = self.assertQueryBudget(8, self.admin_client.post, reverse('admin-add-lesson'), {
+            'course': self.course.course_id,
+            'title': 'Inserted Lesson',
+            'description': 'Goes second.',
+            'order': 2,
+        }, format='json')
+        self.assertEqual(response.data['order'], 2)
+
+    def test_admin_remove_lesson(self):
+        self.assertQueryBudget(
+            12, self.admin_client.delete,
+            reverse('admin-remove-lesson', args=[self.disposable_course.lessons.last().lesson_id])
+        )
+
+    def test_admin_reorder_lessons(self):
+        lesson_ids = [lesson.lesson_id for lesson in reversed(self.lessons)]
+        response = self.assertQueryBudget(
+            10, self.admin_client.put,
+            reverse('admin-reorder-lessons', args=[self.course.course_id]),
+            {'lessons': lesson_ids}, format='json'
+        )
+        self.assertEqual([lesson['lesson_id'] for lesson in response.data], lesson_ids)
+
+    def test_admin_enroll_cohort(self):
+        emails = list(
+            AppUser.objects.filter(role='user').exclude(pk=self.learner.pk).values_list('email', flat=True)
+        )
+        response = self.assertQueryBudget(
+            12, self.admin_client.post,
+            reverse('admin-enroll-cohort', args=[self.courses[-1].course_id]),
+            {'emails': emails + ['missing@example.com'], 'user_ids': [self.learner.pk]}, format='json'
+        )
+        self.assertEqual(len(response.data['enrolled']), LEARNERS + 1)
+        self.assertEqual(response.data['not_found'], ['missing@example.com'])
+
+        response = self.assertQueryBudget(
+            12, self.admin_client.post,
+            reverse('admin-enroll-cohort', args=[self.course.course_id]),
+            {'emails': emails}, format='json'
+        )
+        self.assertEqual(response.data['enrolled'], [])
+        self.assertEqual(len(response.data['already_enrolled']), LEARNERS)
+
+    def test_add_lesson_resources(self):
+        files = [SimpleUploadedFile(f'upload{index}.pdf', f'%PDF-1.4 upload {index % 3}'.encode()) for index in range(5)]
+        # Fixed however many files arrive: blobs and rows are bulk inserted.
+        self.assertQueryBudget(10, self.admin_client.post, reverse('add-lesson-resource'), {
+            'lesson': self.lessons[1].lesson_id,
+            'resources': files,
+            'titles': [f'Upload {index}' for index in range(5)],
+        }, format='multipart')
+
+    def test_delete_lesson_resource(self):
+        resource = LessonResource.objects.filter(lesson__course=self.disposable_course).first()
+        self.assertQueryBudget(
+            7, self.admin_client.delete,
+            reverse('delete-lesson-resource', args=[resource.id])
+        )
+
+    def test_resource_upload_session(self):
+        content = b'%PDF-1.4 chunked upload'
+        response = self.assertQueryBudget(2, self.admin_client.post, reverse('resource-upload-sessions'), {
+            'lesson': self.lesson.lesson_id,
+            'title': 'Chunked',
+            'filename': 'chunked.pdf',
+            'size': len(content),
+        }, format='json')
+        url = reverse('resource-upload-session', args=[response.data['id']])
+
+        self.assertQueryBudget(
+            3, self.admin_client.put, url, content,
+            content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET='0'
+        )
+        self.assertQueryBudget(1, self.admin_client.get, url)
+        with mock.patch('content.views.schedule_derivatives'):
+            self.assertQueryBudget(
+                13, self.admin_client.post, reverse('resource-upload-complete', args=[response.data['id']])
+            )
+
+    def test_abandon_resource_upload_session(self):
+        response = self.admin_client.post(reverse('resource-upload-sessions'), {
+            'lesson': self.lesson.lesson_id, 'title': 'Dropped', 'filename': 'dropped.pdf', 'size': 64,
+        }, format='json')
+        self.assertQueryBudget(
+            4, self.admin_client.delete, reverse('resource-upload-session', args=[response.data['id']])
+        )
+
+    def test_admin_update_course_visibility(self):
+        self.assertQueryBudget(
+            3, self.admin_client.patch,
+            reverse('admin-update-course-visibility', args=[self.course.course_id]),
+            {'is_visible': False}, format='json'
+        )
+
+    def test_admin_update_course(self):
+        self.assertQueryBudget(
+            4, self.admin_client.patch,
+            reverse('admin-update-course', args=[self.course.course_id]),
+            {'description': 'Updated description.'}, format='json'
+        )
+
+    # Authentication endpoints
+
+    def test_register(self):
+        self.assertQueryBudget(5, self.anonymous_client.post, reverse('register'), {
+            'name': 'New Learner',
+            'email': 'new@example.com',
+            'password': 'NewLearner123!',
+        }, format='json')
+
+    def test_login(self):
+        self.assertQueryBudget(2, self.anonymous_client.post, reverse('login'), {
+            'email': self.learner.email,
+            'password': 'LearnerPass123!',
+        }, format='json')
+
+    def test_verify_email(self):
+        verification = EmailVerificationToken.objects.create(user=self.learner)
+        self.assertQueryBudget(
+            5, self.anonymous_client.post, reverse('verify-email'),
+            {'token': str(verification.token)}, format='json'
+        )
+
+    def test_resend_verification(self):
+        self.learner.is_verified = False
+        self.learner.save()
+        self.assertQueryBudget(
+            2, self.anonymous_client.post, reverse('resend-verification'),
+            {'email': self.learner.email}, format='json'
+        )
+
+    def test_change_password(self):
+        self.assertQueryBudget(4, self.learner_client.post, reverse('change-password'), {
+            'current_password': 'LearnerPass123!',
+            'new_password': 'Changed!Pass456',
+        }, format='json')
+
+    def test_logout(self):
+        refresh = RefreshToken.for_user(self.learner)
+        self.assertQueryBudget(
+            7, self.learner_client.post, reverse('logout'),
+            {'refresh_token': str(refresh)}, format='json'
+        )
+
+    # Course and lesson endpoints
+
+    def test_update_lesson_progress(self):
+        self.assertQueryBudget(
+            11, self.learner_client.post,
+            reverse('update-lesson-progress', args=[self.lessons[-1].lesson_id]),
+            {'completed': True}, format='json'
+        )
+
+    def test_bulk_update_lesson_progress(self):
+        entries = [
+            {'lesson_id': lesson.lesson_id, 'completed': True}
+            for course in self.courses[:3]
+            for lesson in Lesson.objects.filter(course=course)
+        ]
+        response = self.assertQueryBudget(
+            11, self.learner_client.post, reverse('bulk-update-lesson-progress'),
+            {'lessons': entries}, format='json'
+        )
+        self.assertEqual(len(response.data['progress']), 3)
+
+    def test_get_course_progress(self):
+        response = self.assertQueryBudget(
+            1, self.learner_client.get, reverse('get-course-progress', args=[self.course.course_id])
+        )
+        self.assertEqual(response.data['completed_lessons'], LESSONS_PER_COURSE // 2)
+
+    def test_course_lessons(self):
+        response = self.assertQueryBudget(
+            2, self.learner_client.get, reverse('course-lessons', args=[self.course.course_id])
+        )
+        self.assertEqual(len(response.data), LESSONS_PER_COURSE)
+        self.assertEqual(sum(lesson['completed'] for lesson in response.data), LESSONS_PER_COURSE // 2)
+
+    def test_lesson_resources(self):
+        response = self.assertQueryBudget(
+            2, self.learner_client.get, reverse('lesson-resources', args=[self.lesson.lesson_id])
+        )
+        self.assertEqual(len(response.data['results']), RESOURCES_PER_LESSON)
+
+    def test_resource_preview(self):
+        response = self.assertQueryBudget(
+            1, self.learner_client.get, reverse('resource-preview', args=[self.resource.id])
+        )
+        response.close()
+
+    def test_resource_download(self):
+        response = self.assertQueryBudget(
+            1, self.learner_client.get, reverse('resource-download', args=[self.resource.id])
+        )
+        response.close()
+
+    def test_lesson_resource_bundle(self):
+        response = self.assertQueryBudget(
+            3, self.get_bundle, reverse('lesson-resource-bundle', args=[self.lesson.lesson_id])
+        )
+        self.assertEqual(len(response.archive.namelist()), RESOURCES_PER_LESSON)
+
+    def test_course_resource_bundle(self):
+        response = self.assertQueryBudget(
+            3, self.get_bundle, reverse('course-resource-bundle', args=[self.course.course_id])
+        )
+        self.assertEqual(len(response.archive.namelist()), RESOURCES_PER_LESSON * LESSONS_PER_COURSE)
+
+    def test_course_search(self):
+        response = self.assertQueryBudget(
+            2, self.learner_client.get, reverse('course-search'), {'q': 'renewable', 'level': 'Beginner'}
+        )
+        self.assertEqual(len(response.data['results']), COURSES)
+        self.assertEqual(response.data['facets']['level']['Beginner'], COURSES)
+
+    def test_available_courses(self):
+        response = self.assertQueryBudget(1, self.learner_client.get, reverse('available-courses'))
+        self.assertEqual(len(response.data['results']), COURSES - 1)
+
+    @override_settings(CONTENT_QUERY_DEBUG=True)
+    def test_available_courses_logs_query(self):
+        with self.assertLogs('content.views', 'DEBUG') as logs:
+            self.learner_client.get(reverse('available-courses'))
+        self.assertIn('SELECT', logs.output[0])
+
+    def test_enrolled_courses(self):
+        Enrollment.objects.bulk_create([
+            Enrollment(user=self.learner, course=course) for course in self.courses[1:6]
+        ])
+        response = self.assertQueryBudget(2, self.learner_client.get, reverse('enrolled-courses'))
+        self.assertEqual(len(response.data['results']), 6)
+        self.assertQueryBudget(1, self.learner_client.get, reverse('enrolled-courses'))
+
+    def test_learner_dashboard(self):
+        Enrollment.objects.bulk_create([
+            Enrollment(user=self.learner, course=course) for course in self.courses[1:6]
+        ])
+        response = self.assertQueryBudget(2, self.learner_client.get, reverse('learner-dashboard'))
+        self.assertEqual(len(response.data['results']), 6)
+        first = response.data['results'][0]
+        self.assertEqual(first['course']['course_id'], self.course.course_id)
+        self.assertEqual(first['progress_percentage'], 50.0)
+        self.assertEqual(first['next_lesson']['lesson_id'], self.lessons[LESSONS_PER_COURSE // 2].lesson_id)
+        self.assertEqual(first['next_lesson']['order'], LESSONS_PER_COURSE // 2 + 1)
+        self.assertEqual(response.data['results'][1]['next_lesson']['order'], 1)
+
+    def test_enroll_course(self):
+        self.assertQueryBudget(
+            13, self.learner_client.post, reverse('enroll-course', args=[self.courses[-1].course_id])
+        )
+
+
+class CatalogPaginationTests(ContentTestCase):
+    """Cursor pages over the catalog snapshot agree with its case-insensitive order."""
+
+    TITLES = ['cherry', 'Delta', 'apple', 'Banana', 'Apple', 'echo', 'banana']
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_users()
+        cls.courses = [
+            Course.objects.create(
+                title=title, description='x', duration='1 week', instructor=cls.admin, is_visible=True
+            )
+            for title in cls.TITLES
+        ]
+        Enrollment.objects.bulk_create([Enrollment(user=cls.learner, course=course) for course in cls.courses])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.learner)
+
+    def walk(self, url, link):
+        titles = []
+        while url:
+            response = self.client.get(url)
+            titles.append([course['title'] for course in response.data['results']])
+            url = response.data[link]
+        return titles
+
+    def test_pages_cover_mixed_case_titles_once(self):
+        expected = [
+            course.title for course in sorted(self.courses, key=lambda course: (course.title.casefold(), course.pk))
+        ]
+        forward = self.walk(f"{reverse('enrolled-courses')}?page_size=2", 'next')
+        self.assertEqual(sum(forward, []), expected)
+
+        last_page = self.client.get(f"{reverse('enrolled-courses')}?page_size=2")
+        while last_page.data['next']:
+            last_page = self.client.get(last_page.data['next'])
+        backward = self.walk(last_page.data['previous'], 'previous')
+        self.assertEqual(sum(reversed(backward), []) + forward[-1], expected)
+
+
+class ConditionalGetTests(ContentTestCase):
+    """Listing endpoints answer 304 from their validators, without serializing."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_course_fixture()
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.learner)
+
+    def revalidate(self, url):
+        etag = self.client.get(url)['ETag']
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_lists_return_not_modified(self):
+        for url in [
+            reverse('available-courses'),
+            reverse('enrolled-courses'),
+            reverse('course-lessons', args=[self.course.course_id]),
+            reverse('lesson-resources', args=[self.lesson.lesson_id]),
+        ]:
+            with self.subTest(url=url):
+                response = self.revalidate(url)
+                self.assertEqual(response.status_code, 304)
+                self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_enrollment_changes_course_lists(self):
+        url = reverse('available-courses')
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('enroll-course', args=[self.course.course_id]))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_completion_changes_lesson_list(self):
+        url = reverse('course-lessons', args=[self.course.course_id])
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('update-lesson-progress', args=[self.lesson.lesson_id]), {'completed': True}, format='json'
+            )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data[0]['completed'])
+
+    def test_progress_recompute_changes_dashboard(self):
+        Lesson.objects.create(course=self.course, title='Lesson 2', description='x', rank=2 * LESSON_RANK_GAP)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('enroll-course', args=[self.course.course_id]))
+            self.client.post(
+                reverse('update-lesson-progress', args=[self.lesson.lesson_id]), {'completed': True}, format='json'
+            )
+        # Added without the admin view, so progress still says 1 of 2 until recomputed.
+        Lesson.objects.create(course=self.course, title='Lesson 3', description='x', rank=3 * LESSON_RANK_GAP)
+        url = reverse('learner-dashboard')
+        etag = self.client.get(url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recompute_course_progress(self.course.course_id)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['total_lessons'], 3)
+        self.assertAlmostEqual(response.data['results'][0]['progress_percentage'], 100 / 3)
+
+    def test_course_edit_changes_catalog(self):
+        url = reverse('available-courses')
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.description = 'Panels, inverters and batteries.'
+            self.course.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_new_resource_changes_resource_list(self):
+        url = reverse('lesson-resources', args=[self.lesson.lesson_id])
+        etag = self.client.get(url)['ETag']
+        LessonResource.objects.create(lesson=self.lesson, title='Notes', file='lesson_resources/notes.pdf')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_backfilled_metadata_changes_resource_list(self):
+        # Saved before its file exists, so size and modified_at wait for the backfill.
+        resource = LessonResource.objects.create(lesson=self.lesson, title='Notes', file='lesson_resources/late.pdf')
+        self.assertIsNone(resource.size)
+        url = reverse('lesson-resources', args=[self.lesson.lesson_id])
+        etag = self.client.get(url)['ETag']
+
+        path = os.path.join(settings.MEDIA_ROOT, resource.file.name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as handle:
+            handle.write(b'%PDF-1.4 late notes')
+        # An old file time still counts as newly recorded metadata.
+        os.utime(path, (0, 0))
+        call_command('backfill_resource_metadata', stdout=io.StringIO())
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['size'], len(b'%PDF-1.4 late notes'))
+
+    def test_removing_course_bumps_each_learner_once(self):
+        Enrollment.objects.create(user=self.learner, course=self.course)
+        LessonProgress.objects.create(user=self.learner, lesson=self.lesson, completed=True)
+        url = reverse('enrolled-courses')
+        etag = self.client.get(url)['ETag']
+
+        admin = APIClient()
+        admin.force_authenticate(self.admin)
+        with mock.patch('content.utils.bump_learner_version', wraps=bump_learner_version) as bump, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = admin.delete(reverse('admin-remove-course', args=[self.course.course_id]))
+        self.assertEqual(response.status_code, 204)
+        bump.assert_called_once_with(self.learner.pk)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class LessonOrderTests(ContentTestCase):
+    """Lesson ranks stay unique and complete while lessons are added and reordered."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_course_fixture(lessons=3)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def ranks(self):
+        return list(Lesson.objects.filter(course=self.course).order_by('rank').values_list('lesson_id', 'rank'))
+
+    def test_reorder_rejects_a_stale_lesson_list(self):
+        lesson_ids = [lesson.lesson_id for lesson in reversed(self.lessons)]
+        # Added after the client built its list.
+        Lesson.objects.create(course=self.course, title='Lesson 4', description='x', rank=4 * LESSON_RANK_GAP)
+        before = self.ranks()
+
+        response = self.client.put(
+            reverse('admin-reorder-lessons', args=[self.course.course_id]), {'lessons': lesson_ids}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.ranks(), before)
+
+    def add_lesson(self, order):
+        # Background tasks run inline once the request commits.
+        with mock.patch('content.tasks.run_in_background', side_effect=lambda func, *args: func(*args)), \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('admin-add-lesson'), {
+                'course': self.course.course_id, 'title': 'Inserted', 'description': 'x', 'order': order,
+            }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['lesson_id']
+
+    def set_ranks(self, *ranks):
+        for lesson, rank in zip(self.lessons, ranks):
+            Lesson.objects.filter(pk=lesson.pk).update(rank=rank)
+
+    def test_insert_bisects_the_gap(self):
+        inserted = self.add_lesson(2)
+        self.assertEqual(self.ranks(), [
+            (self.lessons[0].lesson_id, LESSON_RANK_GAP),
+            (inserted, LESSON_RANK_GAP * 3 // 2),
+            (self.lessons[1].lesson_id, 2 * LESSON_RANK_GAP),
+            (self.lessons[2].lesson_id, 3 * LESSON_RANK_GAP),
+        ])
+
+    def test_exhausted_gap_is_respaced_before_the_insert(self):
+        self.set_ranks(1, 2, 3)
+        inserted = self.add_lesson(2)
+        self.assertEqual(self.ranks(), [
+            (self.lessons[0].lesson_id, LESSON_RANK_GAP),
+            (inserted, LESSON_RANK_GAP * 3 // 2),
+            (self.lessons[1].lesson_id, 2 * LESSON_RANK_GAP),
+            (self.lessons[2].lesson_id, 3 * LESSON_RANK_GAP),
+        ])
+
+    def test_last_room_in_a_gap_is_respaced_after_commit(self):
+        self.set_ranks(LESSON_RANK_GAP, LESSON_RANK_GAP + 3, 2 * LESSON_RANK_GAP)
+        with mock.patch('content.utils.respace_lesson_ranks', wraps=respace_lesson_ranks) as respace:
+            inserted = self.add_lesson(2)
+        respace.assert_called_once_with(self.course.course_id)
+        self.assertEqual(self.ranks(), [
+            (self.lessons[0].lesson_id, LESSON_RANK_GAP),
+            (inserted, 2 * LESSON_RANK_GAP),
+            (self.lessons[1].lesson_id, 3 * LESSON_RANK_GAP),
+            (self.lessons[2].lesson_id, 4 * LESSON_RANK_GAP),
+        ])
+
+
+class VisibilitySweepTests(ContentTestCase):
+    """sweep_visibility_transitions flips due courses and moves them to their next date."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_users()
+
+    def setUp(self):
+        self.now = timezone.now()
+
+    def course(self, title, start=None, end=None, is_visible=True):
+        return Course.objects.create(
+            title=title, description='x', duration='2 weeks', instructor=self.admin, is_visible=is_visible,
+            visibility_start_date=start and self.now + start,
+            visibility_end_date=end and self.now + end,
+        )
+
+    def sweep(self, after):
+        with self.captureOnCommitCallbacks(execute=True):
+            return sweep_visibility_transitions(now=self.now + after)
+
+    def state(self, course):
+        course.refresh_from_db()
+        return course.is_visible, course.next_visibility_transition_at
+
+    def test_shows_then_hides_a_window(self):
+        course = self.course('Window', start=timezone.timedelta(hours=1), end=timezone.timedelta(hours=3))
+        self.assertEqual(self.state(course), (False, course.visibility_start_date))
+
+        version = get_catalog_version()
+        self.assertEqual(self.sweep(timezone.timedelta(hours=2)), 1)
+        self.assertEqual(self.state(course), (True, course.visibility_end_date))
+        self.assertNotEqual(get_catalog_version(), version)
+
+        self.assertEqual(self.sweep(timezone.timedelta(hours=4)), 1)
+        self.assertEqual(self.state(course), (False, None))
+
+    def test_window_missed_entirely_stays_hidden(self):
+        course = self.course('Missed', start=timezone.timedelta(hours=1), end=timezone.timedelta(hours=2))
+        self.assertEqual(self.sweep(timezone.timedelta(hours=3)), 0)
+        self.assertEqual(self.state(course), (False, None))
+
+    def test_end_date_only(self):
+        course = self.course('Expiring', end=timezone.timedelta(hours=1))
+        self.assertEqual(self.state(course), (True, course.visibility_end_date))
+
+        self.assertEqual(self.sweep(timezone.timedelta(minutes=30)), 0)
+        self.assertEqual(self.state(course), (True, course.visibility_end_date))
+
+        self.assertEqual(self.sweep(timezone.timedelta(hours=2)), 1)
+        self.assertEqual(self.state(course), (False, None))
+
+    def test_courses_without_dates_are_untouched(self):
+        course = self.course('Always')
+        hidden = self.course('Never', is_visible=False)
+        self.assertEqual(self.sweep(timezone.timedelta(days=365)), 0)
+        self.assertEqual(self.state(course), (True, None))
+        self.assertEqual(self.state(hidden), (False, None))
+
+
+class CourseStatsTests(ContentTestCase):
+    """Incremental CourseStats updates agree with a full rebuild."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_course_fixture(lessons=4)
+        cls.learners = [
+            AppUser.objects.create_user(f'learner{index}@example.com', f'Learner {index}', is_verified=True)
+            for index in range(4)
+        ]
+
+    def snapshot(self):
+        stats = CourseStats.objects.get(course=self.course)
+        return {
+            'enrolled_count': stats.enrolled_count,
+            'progress_total': round(stats.progress_total, 6),
+            **{field: getattr(stats, field) for field, _, _ in PROGRESS_HISTOGRAM_BUCKETS},
+        }
+
+    def test_incremental_updates_match_rebuild(self):
+        created_at = timezone.now() - timezone.timedelta(days=1)
+        CourseStats.objects.filter(course=self.course).update(updated_at=created_at)
+        client = APIClient()
+        for learner in self.learners[:2]:
+            client.force_authenticate(learner)
+            client.post(reverse('enroll-course', args=[self.course.course_id]))
+
+        client.force_authenticate(self.admin)
+        client.post(
+            reverse('admin-enroll-cohort', args=[self.course.course_id]),
+            {'user_ids': [learner.pk for learner in self.learners]}, format='json'
+        )
+
+        client.force_authenticate(self.learners[0])
+        for lesson in self.lessons:
+            client.post(reverse('update-lesson-progress', args=[lesson.lesson_id]), {'completed': True}, format='json')
+        client.post(
+            reverse('update-lesson-progress', args=[self.lessons[0].lesson_id]), {'completed': False}, format='json'
+        )
+        client.force_authenticate(self.learners[1])
+        client.post(reverse('bulk-update-lesson-progress'), {'lessons': [
+            {'lesson_id': lesson.lesson_id, 'completed': True} for lesson in self.lessons[:2]
+        ]}, format='json')
+
+        incremental = self.snapshot()
+        self.assertEqual(incremental['enrolled_count'], 4)
+        self.assertEqual(incremental['progress_75_100_count'], 1)
+        self.assertEqual(incremental['progress_50_75_count'], 1)
+        self.assertEqual(incremental['not_started_count'], 2)
+        self.assertGreater(CourseStats.objects.get(course=self.course).updated_at, created_at)
+
+        rebuild_course_stats([self.course.course_id])
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_reconcile_repairs_drifted_counters(self):
+        learner = self.learners[0]
+        Enrollment.objects.create(user=learner, course=self.course)
+        LessonProgress.objects.create(user=learner, lesson=self.lessons[0], completed=True)
+        CourseProgress.objects.create(
+            user=learner, course=self.course, completed_lessons=3, total_lessons=2, progress_percentage=100
+        )
+        rebuild_course_stats([self.course.course_id])
+
+        call_command('reconcile_course_progress', course=self.course.course_id, stdout=io.StringIO())
+        progress = CourseProgress.objects.get(user=learner, course=self.course)
+        self.assertEqual((progress.completed_lessons, progress.total_lessons, progress.progress_percentage), (1, 4, 25))
+
+        incremental = self.snapshot()
+        self.assertEqual(incremental['progress_25_50_count'], 1)
+        rebuild_course_stats([self.course.course_id])
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_cohort_over_leftover_progress_matches_rebuild(self):
+        learner = self.learners[0]
+        LessonProgress.objects.create(user=learner, lesson=self.lessons[0], completed=True)
+        # A progress row from an earlier enrollment, already counted in the stats.
+        CourseProgress.objects.create(user=learner, course=self.course, total_lessons=4, progress_percentage=0)
+        rebuild_course_stats([self.course.course_id])
+
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.post(
+            reverse('admin-enroll-cohort', args=[self.course.course_id]),
+            {'user_ids': [learner.pk for learner in self.learners]}, format='json'
+        )
+        self.assertEqual(len(response.data['enrolled']), 4)
+        self.assertEqual(CourseProgress.objects.get(user=learner, course=self.course).progress_percentage, 25)
+
+        incremental = self.snapshot()
+        self.assertEqual(incremental['enrolled_count'], 4)
+        rebuild_course_stats([self.course.course_id])
+        self.assertEqual(self.snapshot(), incremental)
+
+
+class DedupeProgressTests(ContentTestMixin, TransactionTestCase):
+    """dedupe_progress merges rows written before the unique constraints existed."""
+
+    def setUp(self):
+        cache.clear()
+        self.create_course_fixture(lessons=2)
+        # Recreate the pre-constraint schema so duplicates can be inserted.
+        self.constraints = [
+            (model, constraint)
+            for model in (LessonProgress, CourseProgress)
+            for constraint in model._meta.constraints
+        ]
+        with connection.schema_editor() as editor:
+            for model, constraint in self.constraints:
+                # SQLite rebuilds the table from the model, as a migration's state would have it.
+                with mock.patch.object(model._meta, 'constraints', []):
+                    editor.remove_constraint(model, constraint)
+        self.addCleanup(self.restore_constraints)
+
+    def restore_constraints(self):
+        LessonProgress.objects.all().delete()
+        CourseProgress.objects.all().delete()
+        with connection.schema_editor() as editor:
+            for model, constraint in self.constraints:
+                editor.add_constraint(model, constraint)
+
+    def test_merges_duplicates_and_recomputes(self):
+        Enrollment.objects.create(user=self.learner, course=self.course)
+        LessonProgress.objects.bulk_create([
+            LessonProgress(user=self.learner, lesson=self.lessons[0], completed=False),
+            LessonProgress(user=self.learner, lesson=self.lessons[0], completed=True),
+        ])
+        CourseProgress.objects.bulk_create([
+            CourseProgress(user=self.learner, course=self.course, total_lessons=2),
+            CourseProgress(user=self.learner, course=self.course, total_lessons=2),
+        ])
+        version = get_learner_version(self.learner.pk)
+
+        call_command('dedupe_progress', stdout=io.StringIO())
+
+        self.assertEqual(
+            list(LessonProgress.objects.values_list('lesson_id', 'completed')), [(self.lessons[0].pk, True)]
+        )
+        progress = CourseProgress.objects.get()
+        self.assertEqual((progress.completed_lessons, progress.progress_percentage), (1, 50))
+        stats = CourseStats.objects.get(course=self.course)
+        self.assertEqual((stats.progress_total, stats.progress_50_75_count), (50, 1))
+        self.assertNotEqual(get_learner_version(self.learner.pk), version)
+
+
+class ResourceServingTests(ContentTestCase):
+    """Previews and downloads honour Range requests or hand off to nginx."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_course_fixture()
+        cls.content = bytes(range(256)) * 4
+        cls.resource = LessonResource.objects.create(
+            lesson=cls.lesson, title='Datasheet', file=SimpleUploadedFile('datasheet.pdf', cls.content)
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.learner)
+        self.url = reverse('resource-preview', args=[self.resource.id])
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_full_file_advertises_ranges(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(self.body(response), self.content)
+
+    def test_single_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.content)}')
+        self.assertEqual(self.body(response), self.content[10:20])
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(self.body(response), self.content[-5:])
+
+    def test_multiple_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-3,100-103')
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response['Content-Type'].startswith('multipart/byteranges'))
+        body = self.body(response)
+        self.assertEqual(int(response['Content-Length']), len(body))
+        self.assertIn(self.content[0:4], body)
+        self.assertIn(f'Content-Range: bytes 100-103/{len(self.content)}'.encode(), body)
+
+    def test_unread_response_closes_the_file(self):
+        handle = io.BytesIO(self.content)
+        response = streaming_response(handle, [(0, 3)], len(self.content), 'application/pdf')
+        response.close()
+        self.assertTrue(handle.closed)
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')
+
+    def test_stale_if_range_sends_whole_file(self):
+        response = self.client.get(
+            self.url, HTTP_RANGE='bytes=0-3', HTTP_IF_RANGE='Wed, 21 Oct 2015 07:28:00 GMT'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_head_and_if_none_match_skip_the_disk(self):
+        url = reverse('resource-download', args=[self.resource.id])
+        with mock.patch('content.serving.open', side_effect=AssertionError, create=True), \
+                mock.patch('content.serving.os.stat', side_effect=AssertionError):
+            response = self.client.head(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(int(response['Content-Length']), len(self.content))
+            self.assertEqual(response['ETag'], f'"{hashlib.sha256(self.content).hexdigest()}"')
+
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, 304)
+
+    def test_listing_reports_sizes(self):
+        response = self.client.get(reverse('lesson-resources', args=[self.resource.lesson_id]))
+        self.assertEqual(response.data['results'][0]['size'], len(self.content))
+        self.assertEqual(response.data['results'][0]['content_type'], 'application/pdf')
+
+    @override_settings(RESOURCE_SERVE_MODE='accel')
+    def test_accel_redirect_download(self):
+        response = self.client.get(reverse('resource-download', args=[self.resource.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.resource.file.name)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="Datasheet.pdf"')
+        self.assertEqual(response.content, b'')
+
+
+class ResourceBlobTests(ContentTestCase):
+    """Identical uploads share one stored file, released with its last resource."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_course_fixture(lessons=2)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def upload(self, lesson, name, content):
+        response = self.client.post(reverse('add-lesson-resource'), {
+            'lesson': lesson.lesson_id,
+            'resources': [SimpleUploadedFile(name, content)],
+            'titles': [name],
+        }, format='multipart')
+        self.assertEqual(response.status_code, 201, response.data)
+        return LessonResource.objects.get(pk=response.data[0]['id'])
+
+    def delete(self, resource):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(reverse('delete-lesson-resource', args=[resource.id]))
+        self.assertEqual(response.status_code, 204)
+
+    def test_identical_uploads_share_a_blob(self):
+        first = self.upload(self.lessons[0], 'slides.pdf', b'%PDF-1.4 shared')
+        second = self.upload(self.lessons[1], 'copy.pdf', b'%PDF-1.4 shared')
+        other = self.upload(self.lessons[1], 'notes.pdf', b'%PDF-1.4 other')
+
+        self.assertEqual(first.blob_id, second.blob_id)
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertNotEqual(first.blob_id, other.blob_id)
+        self.assertEqual(ResourceBlob.objects.get(pk=first.blob_id).ref_count, 2)
+
+    def test_last_reference_removes_the_file(self):
+        first = self.upload(self.lessons[0], 'slides.pdf', b'%PDF-1.4 shared')
+        second = self.upload(self.lessons[1], 'copy.pdf', b'%PDF-1.4 shared')
+        path = first.file.path
+
+        self.delete(first)
+        self.assertEqual(ResourceBlob.objects.get(pk=second.blob_id).ref_count, 1)
+        self.assertTrue(os.path.exists(path))
+
+        self.delete(second)
+        self.assertFalse(ResourceBlob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_failed_batch_removes_written_files(self):
+        blobs_dir = os.path.join(settings.MEDIA_ROOT, 'lesson_resources', 'blobs')
+        before = {os.path.join(root, name) for root, _, names in os.walk(blobs_dir) for name in names}
+        with mock.patch.object(LessonResource.objects, 'bulk_create', side_effect=RuntimeError('insert failed')):
+            with self.assertRaises(RuntimeError):
+                create_lesson_resources(self.lessons[0], [
+                    (f'Upload {index}', SimpleUploadedFile(f'upload{index}.pdf', f'%PDF-1.4 {index}'.encode()))
+                    for index in range(4)
+                ])
+
+        after = {os.path.join(root, name) for root, _, names in os.walk(blobs_dir) for name in names}
+        self.assertEqual(after, before)
+        self.assertFalse(ResourceBlob.objects.exists())
+
+    def test_removing_a_lesson_releases_its_blobs(self):
+        kept = self.upload(self.lessons[0], 'slides.pdf', b'%PDF-1.4 shared')
+        self.upload(self.lessons[1], 'copy.pdf', b'%PDF-1.4 shared')
+        self.upload(self.lessons[1], 'notes.pdf', b'%PDF-1.4 other')
+
+        # Progress recomputation runs on a worker thread; it is not under test here.
+        with mock.patch('content.views.run_on_commit'), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(reverse('admin-remove-lesson', args=[self.lessons[1].lesson_id]))
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(list(ResourceBlob.objects.values_list('pk', 'ref_count')), [(kept.blob_id, 1)])
+        self.assertTrue(os.path.exists(kept.file.path))
+
+
+@override_settings(RESOURCE_UPLOAD_CHUNK_MAX_SIZE=1024)
+class ResourceUploadTests(ContentTestCase):
+    """Resumable uploads append checked chunks and finish as a LessonResource."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_course_fixture()
+        cls.content = b'%PDF-1.4 ' + bytes(range(256)) * 10
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        response = self.client.post(reverse('resource-upload-sessions'), {
+            'lesson': self.lesson.lesson_id,
+            'title': 'Datasheet',
+            'filename': 'datasheet.pdf',
+            'size': len(self.content),
+            'sha256': hashlib.sha256(self.content).hexdigest(),
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.upload_id = response.data['id']
+        self.url = reverse('resource-upload-session', args=[self.upload_id])
+        self.complete_url = reverse('resource-upload-complete', args=[self.upload_id])
+
+    def put_chunk(self, offset, data, **headers):
+        return self.client.put(
+            self.url, data, content_type='application/offset+octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset), **headers
+        )
+
+    def test_chunks_complete_into_a_resource(self):
+        for offset in range(0, len(self.content), 1024):
+            chunk = self.content[offset:offset + 1024]
+            response = self.put_chunk(
+                offset, chunk, HTTP_UPLOAD_CHECKSUM=f'sha256 {hashlib.sha256(chunk).hexdigest()}'
+            )
+            self.assertEqual(response.status_code, 200, response.data)
+            self.assertEqual(int(response['Upload-Offset']), offset + len(chunk))
+
+        with mock.patch('content.views.schedule_derivatives'), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.complete_url)
+        self.assertEqual(response.status_code, 201, response.data)
+        resource = LessonResource.objects.get(pk=response.data['id'])
+        self.assertEqual(resource.lesson_id, self.lesson.lesson_id)
+        with resource.file.open('rb') as handle:
+            self.assertEqual(handle.read(), self.content)
+        self.assertFalse(ResourceUploadSession.objects.exists())
+        self.assertFalse(os.path.exists(
+            os.path.join(settings.MEDIA_ROOT, 'lesson_resources', 'uploads', f'{self.upload_id}.part')
+        ))
+
+    def test_resume_from_reported_offset(self):
+        self.put_chunk(0, self.content[:1024])
+        response = self.put_chunk(0, self.content[:1024])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(int(response['Upload-Offset']), 1024)
+
+        offset = int(self.client.get(self.url)['Upload-Offset'])
+        self.assertEqual(self.put_chunk(offset, self.content[offset:offset + 1024]).status_code, 200)
+
+    def test_chunk_in_flight_blocks_another(self):
+        self.put_chunk(0, self.content[:1024])
+        path = os.path.join(settings.MEDIA_ROOT, 'lesson_resources', 'uploads', f'{self.upload_id}.part')
+        with open(path, 'ab') as part:
+            fcntl.flock(part, fcntl.LOCK_EX)
+            response = self.put_chunk(1024, self.content[1024:2048])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(int(response['Upload-Offset']), 1024)
+        self.assertEqual(self.put_chunk(1024, self.content[1024:2048]).status_code, 200)
+
+    def test_bad_checksum_leaves_offset_unchanged(self):
+        response = self.put_chunk(0, self.content[:1024], HTTP_UPLOAD_CHECKSUM=f'sha256 {"0" * 64}')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(int(response['Upload-Offset']), 0)
+        self.assertEqual(self.put_chunk(0, self.content[:1024]).status_code, 200)
+
+    def test_incomplete_upload_cannot_finish(self):
+        self.put_chunk(0, self.content[:1024])
+        self.assertEqual(self.client.post(self.complete_url).status_code, 400)
+        self.assertFalse(LessonResource.objects.exists())
+
+    def test_chunks_cannot_pass_declared_size(self):
+        response = self.put_chunk(0, self.content[:1024] * 4)
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(RESOURCE_UPLOAD_MAX_SIZE=1024)
+    def test_declared_size_is_capped(self):
+        response = self.client.post(reverse('resource-upload-sessions'), {
+            'lesson': self.lesson.lesson_id, 'title': 'Big', 'filename': 'big.pdf', 'size': 2048,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class ResourceDerivativeTests(ContentTestCase):
+    """Previews prefer the smallest rendering that still covers the request."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_course_fixture()
+
+        # Noise compresses badly, so the original is far bigger than its renderings.
+        image = Image.frombytes('RGB', (2000, 1000), os.urandom(2000 * 1000 * 3))
+        png = io.BytesIO()
+        image.save(png, 'PNG')
+        cls.png = png.getvalue()
+
+        pdf = pypdfium2.PdfDocument.new()
+        pdf.new_page(612, 792)
+        document = io.BytesIO()
+        pdf.save(document)
+        cls.document = document.getvalue()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.learner)
+        self.image = LessonResource.objects.create(
+            lesson=self.lesson, title='Diagram', file=SimpleUploadedFile('diagram.png', self.png)
+        )
+        self.pdf = LessonResource.objects.create(
+            lesson=self.lesson, title='Datasheet', file=SimpleUploadedFile('datasheet.pdf', self.document)
+        )
+
+    def preview(self, resource, **params):
+        accept = params.pop('accept', 'application/json')
+        response = self.client.get(
+            reverse('resource-preview', args=[resource.id]), params, HTTP_ACCEPT=accept
+        )
+        self.assertEqual(response.status_code, 200)
+        response.close()
+        return response
+
+    def test_image_derivatives(self):
+        self.assertEqual(generate_derivatives(self.image.pk), 3)
+        derivatives = {derivative.kind: derivative for derivative in self.image.derivatives.all()}
+        self.assertEqual(set(derivatives), {'thumbnail', 'thumbnail_webp', 'display_webp'})
+        self.assertEqual((derivatives['display_webp'].width, derivatives['display_webp'].height), (1280, 640))
+        self.assertEqual(derivatives['thumbnail'].content_type, 'image/jpeg')
+
+        self.assertEqual(self.preview(self.image, accept='image/webp,*/*')['Content-Type'], 'image/webp')
+        self.assertEqual(self.preview(self.image)['Content-Type'], 'image/png')
+        self.assertEqual(self.preview(self.image, width=200)['Content-Type'], 'image/jpeg')
+        self.assertIn('Accept', self.preview(self.image)['Vary'])
+
+        # The stored size decides between original and rendering; the file is not stat'ed.
+        with mock.patch('django.db.models.fields.files.FieldFile.size', new_callable=mock.PropertyMock) as size:
+            size.side_effect = FileNotFoundError
+            self.assertEqual(pick_preview(self.image, derivatives.values(), width=200), derivatives['thumbnail'])
+
+    def test_pdf_first_page(self):
+        self.assertEqual(generate_derivatives(self.pdf.pk), 4)
+        self.assertEqual(self.preview(self.pdf)['Content-Type'], 'application/pdf')
+        self.assertEqual(self.preview(self.pdf, width=200)['Content-Type'], 'image/png')
+        self.assertEqual(self.preview(self.pdf, width=1000, accept='image/webp,*/*')['Content-Type'], 'image/webp')
+
+    def test_deleting_a_resource_removes_its_derivatives(self):
+        generate_derivatives(self.image.pk)
+        paths = [derivative.file.path for derivative in self.image.derivatives.all()]
+        admin_client = APIClient()
+        admin_client.force_authenticate(self.image.lesson.course.instructor)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            admin_client.delete(reverse('delete-lesson-resource', args=[self.image.id]))
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+
+
+class OrphanFileTests(ContentTestCase):
+    """purge_orphan_files only removes old files that nothing refers to."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_course_fixture()
+
+    def write(self, name, age=7200):
+        path = os.path.join(settings.MEDIA_ROOT, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as handle:
+            handle.write(b'data')
+        os.utime(path, (time.time() - age, time.time() - age))
+        return name
+
+    def test_purges_only_old_unreferenced_files(self):
+        resource = LessonResource.objects.create(
+            lesson=self.lesson, title='Datasheet', file=SimpleUploadedFile('datasheet.pdf', b'%PDF-1.4 kept')
+        )
+        os.utime(resource.file.path, (time.time() - 7200, time.time() - 7200))
+        session = ResourceUploadSession.objects.create(
+            lesson=self.lesson, created_by=self.admin, title='Video', filename='video.pdf', size=10
+        )
+        part = self.write(f'lesson_resources/uploads/{session.pk}.part')
+        orphan = self.write('lesson_resources/blobs/ab/orphan.pdf')
+        young = self.write('lesson_resources/young.pdf', age=0)
+
+        self.assertIn(orphan, purge_orphan_files(min_age=3600, dry_run=True))
+        self.assertTrue(os.path.exists(os.path.join(settings.MEDIA_ROOT, orphan)))
+
+        purged = purge_orphan_files(min_age=3600, batch_size=2)
+        self.assertIn(orphan, purged)
+        self.assertNotIn(resource.file.name, purged)
+        self.assertNotIn(part, purged)
+        self.assertNotIn(young, purged)
+        self.assertFalse(os.path.exists(os.path.join(settings.MEDIA_ROOT, orphan)))
+        self.assertTrue(os.path.exists(resource.file.path))
+
+
+class ResourceBundleTests(ContentTestCase):
+    """Lesson and course resources stream out as one ZIP."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_course_fixture(lessons=2)
+        cls.files = {
+            'Notes.pdf': b'%PDF-1.4 ' + b'notes ' * 1000,
+            'Notes (2).pdf': b'%PDF-1.4 other notes',
+            'Diagram.png': b'\x89PNG' + bytes(range(256)) * 8,
+        }
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.learner)
+        for name, content in self.files.items():
+            LessonResource.objects.create(
+                lesson=self.lessons[0], title=name.split('.')[0].split(' (')[0],
+                file=SimpleUploadedFile(name.replace(' (2)', ''), content)
+            )
+        LessonResource.objects.create(
+            lesson=self.lessons[1], title='Notes', file=SimpleUploadedFile('notes.pdf', b'%PDF-1.4 lesson two')
+        )
+
+    def archive(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        return zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+
+    def test_lesson_bundle(self):
+        archive = self.archive(reverse('lesson-resource-bundle', args=[self.lessons[0].lesson_id]))
+        self.assertEqual({name: archive.read(name) for name in archive.namelist()}, self.files)
+        self.assertEqual(archive.getinfo('Diagram.png').compress_type, zipfile.ZIP_STORED)
+        self.assertEqual(archive.getinfo('Notes.pdf').compress_type, zipfile.ZIP_DEFLATED)
+        self.assertIsNone(archive.testzip())
+
+    def test_course_bundle_groups_by_lesson(self):
+        archive = self.archive(reverse('course-resource-bundle', args=[self.course.course_id]))
+        self.assertEqual(
+            sorted(archive.namelist()),
+            ['Lesson 1/Diagram.png', 'Lesson 1/Notes (2).pdf', 'Lesson 1/Notes.pdf', 'Lesson 2/Notes.pdf']
+        )
+        self.assertEqual(archive.read('Lesson 2/Notes.pdf'), b'%PDF-1.4 lesson two')
+
+    def test_empty_lesson(self):
+        LessonResource.objects.filter(lesson=self.lessons[1]).delete()
+        response = self.client.get(reverse('lesson-resource-bundle', args=[self.lessons[1].lesson_id]))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,166 @@
+import fcntl
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.db import transaction
+from django.utils import timezone
+
+from .blobs import create_lesson_resource
+from .models import ResourceUploadSession
+
+CHUNK_READ_SIZE = 64 * 1024
+
+
+class HashingUploadHandlerMixin:
+    """Hash each uploaded file as its chunks arrive and expose it as file.sha256."""
+
+    def new_file(self, *args, **kwargs):
+        # Set first: the memory handler raises StopFutureHandlers from new_file.
+        self.sha256 = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        # The memory handler passes chunks on untouched once a file outgrows it.
+        if getattr(self, 'activated', True):
+            self.sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.sha256 = self.sha256.hexdigest()
+        return file
+
+
+class HashingMemoryFileUploadHandler(HashingUploadHandlerMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(HashingUploadHandlerMixin, TemporaryFileUploadHandler):
+    pass
+
+
+class ChunkRejected(Exception):
+    pass
+
+
+class UploadOffsetMismatch(ChunkRejected):
+    pass
+
+
+class UploadedPart(File):
+    # FileSystemStorage moves files that expose temporary_file_path instead of
+    # copying them, so a finished part becomes its blob without a second write.
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def upload_part_path(session):
+    return os.path.join(settings.MEDIA_ROOT, 'lesson_resources', 'uploads', f'{session.pk}.part')
+
+
+def parse_chunk_checksum(header):
+    # "sha256 <hex digest>", the only algorithm accepted.
+    if not header:
+        return None
+    algorithm, _, digest = header.partition(' ')
+    if algorithm.lower() != 'sha256' or len(digest.strip()) != 64:
+        raise ChunkRejected('Upload-Checksum must be "sha256 <hex digest>".')
+    return digest.strip().lower()
+
+
+def write_chunk(session, stream, offset, length, checksum=None):
+    """Append `length` bytes from `stream` at `offset` and advance session.received.
+
+    Chunks of one session are serialized by a lock on its part file rather
+    than the session row, so no transaction stays open while the body
+    arrives. Raises ResourceUploadSession.DoesNotExist if the upload is
+    abandoned meanwhile.
+    """
+    if length <= 0 or length > settings.RESOURCE_UPLOAD_CHUNK_MAX_SIZE:
+        raise ChunkRejected(f'Chunks must be between 1 and {settings.RESOURCE_UPLOAD_CHUNK_MAX_SIZE} bytes.')
+
+    path = upload_part_path(session)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'ab') as part:
+        try:
+            fcntl.flock(part, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadOffsetMismatch('Another chunk of this upload is still being written.')
+
+        # Only the holder of the file lock moves `received`.
+        session.refresh_from_db(fields=['received'])
+        if offset != session.received:
+            raise UploadOffsetMismatch(f'Expected offset {session.received}.')
+        if offset + length > session.size:
+            raise ChunkRejected(f'Chunk ends past the declared size of {session.size} bytes.')
+        if os.fstat(part.fileno()).st_size < offset:
+            raise ChunkRejected('Uploaded data is missing; start a new upload.')
+
+        # Drop anything a broken earlier request left past the committed offset.
+        part.truncate(offset)
+        sha256 = hashlib.sha256()
+        written = 0
+        while written < length:
+            data = stream.read(min(CHUNK_READ_SIZE, length - written))
+            if not data:
+                break
+            part.write(data)
+            sha256.update(data)
+            written += len(data)
+
+        if written != length or (checksum and sha256.hexdigest() != checksum):
+            part.truncate(offset)
+            raise ChunkRejected(
+                'Chunk checksum does not match.' if written == length else
+                f'Chunk ended after {written} of {length} bytes.'
+            )
+
+        # On disk before the new offset lets the upload be completed.
+        part.flush()
+        if not ResourceUploadSession.objects.filter(pk=session.pk, received=offset).update(
+            received=offset + length, updated_at=timezone.now()
+        ):
+            raise ResourceUploadSession.DoesNotExist('Upload was abandoned while the chunk was written.')
+    session.received = offset + length
+
+
+def file_sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for data in iter(lambda: handle.read(CHUNK_READ_SIZE), b''):
+            sha256.update(data)
+    return sha256.hexdigest()
+
+
+def remove_part(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def discard_part(session):
+    path = upload_part_path(session)
+    transaction.on_commit(lambda: remove_part(path))
+
+
+def finalize_upload(session):
+    """Turn a complete session into a LessonResource; call inside a transaction."""
+    if session.received != session.size:
+        raise ChunkRejected(f'Upload is incomplete: {session.received} of {session.size} bytes received.')
+
+    path = upload_part_path(session)
+    digest = file_sha256(path)
+    if session.sha256 and digest != session.sha256:
+        raise ChunkRejected('Uploaded file does not match the declared sha256.')
+
+    with open(path, 'rb') as handle:
+        part = UploadedPart(handle, name=session.filename)
+        part.sha256 = digest
+        resource = create_lesson_resource(session.lesson, session.title, part)
+
+    discard_part(session)
+    session.delete()
+    return resource
@@ -5,6 +5,7 @@ urlpatterns = [
     # Admin endpoints
     path('admin/users/', views.AdminUserListView.as_view(), name='admin-users'),
     path('admin/courses/', views.AdminListCoursesView.as_view(), name='admin-list-courses'),
+    path('admin/courses/stats/', views.AdminCourseStatsView.as_view(), name='admin-course-stats'),
     path('admin/courses/add/', views.AdminAddCourseView.as_view(), name='admin-add-course'),
     path('admin/courses/remove/<int:course_id>/', views.AdminRemoveCourseView.as_view(), name='admin-remove-course'),
     path('admin/events/', views.AdminListEventsView.as_view(), name='admin-list-events'),
@@ -12,8 +13,13 @@ urlpatterns = [
     path('admin/events/<int:event_id>/remove/', views.AdminRemoveEventView.as_view(), name='admin-remove-event'),
     path('admin/lessons/add/', views.AdminAddLessonView.as_view(), name='admin-add-lesson'),
     path('admin/lessons/<int:lesson_id>/remove', views.AdminRemoveLessonView.as_view(), name='admin-remove-lesson'),
+    path('admin/courses/<int:course_id>/lessons/reorder/', views.AdminReorderLessonsView.as_view(), name='admin-reorder-lessons'),
+    path('admin/courses/<int:course_id>/enroll/', views.AdminEnrollCohortView.as_view(), name='admin-enroll-cohort'),
     path('admin/lessons/resources/add/', views.AddLessonResourceView.as_view(), name='add-lesson-resource'),
     path('admin/lessons/resources/<int:id>/', views.DeleteLessonResourceView.as_view(), name='delete-lesson-resource'),
+    path('admin/lessons/resources/uploads/', views.ResourceUploadSessionCreateView.as_view(), name='resource-upload-sessions'),
+    path('admin/lessons/resources/uploads/<uuid:upload_id>/', views.ResourceUploadSessionView.as_view(), name='resource-upload-session'),
+    path('admin/lessons/resources/uploads/<uuid:upload_id>/complete/', views.ResourceUploadCompleteView.as_view(), name='resource-upload-complete'),
     path('admin/courses/<int:course_id>/visibility/', views.AdminUpdateCourseVisibilityView.as_view(), name='admin-update-course-visibility'),
     path('admin/courses/<str:course_id>/update/', views.AdminUpdateCourseView.as_view(), name='admin-update-course'),
     
@@ -27,12 +33,17 @@ urlpatterns = [
 
     # Course and Lesson endpoints
     path('lessons/<int:lesson_id>/progress/', views.UpdateLessonProgressView.as_view(), name='update-lesson-progress'),
+    path('lessons/progress/bulk/', views.BulkUpdateLessonProgressView.as_view(), name='bulk-update-lesson-progress'),
     path('courses/<int:course_id>/progress/', views.GetCourseProgressView.as_view(), name='get-course-progress'),
     path('courses/<int:course_id>/lessons/', views.CourseLessonsView.as_view(), name='course-lessons'),
     path('lessons/<int:lesson_id>/resources/', views.LessonResourcesView.as_view(), name='lesson-resources'),
     path('resources/<int:resource_id>/preview/', views.ResourcePreviewView.as_view(), name='resource-preview'),
     path('resources/<int:resource_id>/download/', views.ResourceDownloadView.as_view(), name='resource-download'),
+    path('lessons/<int:lesson_id>/resources/bundle/', views.LessonResourceBundleView.as_view(), name='lesson-resource-bundle'),
+    path('courses/<int:course_id>/resources/bundle/', views.CourseResourceBundleView.as_view(), name='course-resource-bundle'),
+    path('courses/search/', views.CourseSearchView.as_view(), name='course-search'),
     path('courses/available/', views.AvailableCoursesView.as_view(), name='available-courses'),
     path('courses/enrolled/', views.EnrolledCoursesView.as_view(), name='enrolled-courses'),
+    path('dashboard/', views.LearnerDashboardView.as_view(), name='learner-dashboard'),
     path('courses/enroll/<int:course_id>/', views.EnrollCourseView.as_view(), name='enroll-course'),
 ]
@@ -1,4 +1,27 @@
-from .models import CourseProgress, LessonProgress
+from functools import partial
+
+from django.db import connection, transaction
+from django.db.models import Case, Count, DateTimeField, Exists, F, Max, OuterRef, Q, Value, When, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from .catalog import bump_catalog_version, bump_learner_version
+from .models import LESSON_RANK_GAP, AppUser, Course, CourseProgress, Enrollment, Lesson, LessonProgress
+from .stats import add_progress_change, apply_stats_deltas, stats_deltas
+from .tasks import run_on_commit
+
+PROGRESS_RECOMPUTE_BATCH_SIZE = 500
+
+
+def upsert(model, objs, unique_fields, update_fields):
+    # One INSERT ... ON DUPLICATE KEY UPDATE (ON CONFLICT elsewhere). MySQL
+    # infers the conflict target from the unique index; other backends need it.
+    if not connection.features.supports_update_conflicts_with_target:
+        unique_fields = None
+    return model.objects.bulk_create(
+        objs, update_conflicts=True, unique_fields=unique_fields, update_fields=update_fields
+    )
+
 
 def calculate_course_progress(user, course):
     lessons = course.lessons.all()
@@ -7,6 +30,386 @@ def calculate_course_progress(user, course):
 
     progress_percentage = (completed_lessons / total_lessons) * 100 if total_lessons > 0 else 0
 
-    course_progress, created = CourseProgress.objects.get_or_create(user=user, course=course)
-    course_progress.progress_percentage = progress_percentage
-    course_progress.save()
+    with transaction.atomic():
+        old_percentage = CourseProgress.objects.select_for_update().filter(
+            user=user, course=course
+        ).values_list('progress_percentage', flat=True).first()
+        upsert(
+            CourseProgress,
+            [CourseProgress(
+                user=user,
+                course=course,
+                completed_lessons=completed_lessons,
+                total_lessons=total_lessons,
+                progress_percentage=progress_percentage
+            )],
+            unique_fields=['user', 'course'],
+            update_fields=['completed_lessons', 'total_lessons', 'progress_percentage']
+        )
+        deltas = stats_deltas()
+        add_progress_change(deltas, course.course_id, old_percentage, progress_percentage)
+        apply_stats_deltas(deltas)
+
+
+def recalculate_user_course_progress(user, course_ids):
+    totals = {
+        row['course_id']: row['total']
+        for row in Lesson.objects.filter(course_id__in=course_ids)
+        .values('course_id').annotate(total=Count('lesson_id'))
+    }
+    completed = {
+        row['lesson__course_id']: row['done']
+        for row in LessonProgress.objects.filter(
+            user=user, lesson__course_id__in=course_ids, completed=True
+        ).values('lesson__course_id').annotate(done=Count('lesson_id', distinct=True))
+    }
+
+    progresses = []
+    for course_id in course_ids:
+        total_lessons = totals.get(course_id, 0)
+        completed_lessons = completed.get(course_id, 0)
+        progresses.append(CourseProgress(
+            user=user,
+            course_id=course_id,
+            total_lessons=total_lessons,
+            completed_lessons=completed_lessons,
+            progress_percentage=(completed_lessons / total_lessons) * 100 if total_lessons > 0 else 0
+        ))
+
+    with transaction.atomic():
+        old_percentages = dict(
+            CourseProgress.objects.select_for_update().filter(user=user, course_id__in=course_ids)
+            .values_list('course_id', 'progress_percentage')
+        )
+        upsert(
+            CourseProgress,
+            progresses,
+            unique_fields=['user', 'course'],
+            update_fields=['total_lessons', 'completed_lessons', 'progress_percentage']
+        )
+        deltas = stats_deltas()
+        for progress in progresses:
+            add_progress_change(
+                deltas, progress.course_id, old_percentages.get(progress.course_id), progress.progress_percentage
+            )
+        apply_stats_deltas(deltas)
+    return {progress.course_id: progress.progress_percentage for progress in progresses}
+
+
+def set_lesson_completion(user, lesson, completed):
+    with transaction.atomic():
+        changed = LessonProgress.objects.filter(
+            user=user, lesson=lesson, completed=not completed
+        ).update(completed=completed)
+
+        if not changed:
+            # First touch of this lesson: the unique (user, lesson) index makes
+            # get_or_create safe against a concurrent insert.
+            _, created = LessonProgress.objects.get_or_create(
+                user=user, lesson=lesson, defaults={'completed': completed}
+            )
+            changed = created and completed
+
+        if not changed:
+            return
+        # The flip UPDATE above bypasses the LessonProgress signals.
+        transaction.on_commit(partial(bump_learner_version, user.pk))
+
+        progresses = CourseProgress.objects.filter(user=user, course_id=lesson.course_id)
+        # Locking the row makes the percentage computed here agree with the
+        # counter the F() update leaves behind.
+        progress = progresses.select_for_update().values(
+            'completed_lessons', 'total_lessons', 'progress_percentage'
+        ).first()
+        if progress is None:
+            calculate_course_progress(user, lesson.course)
+            return
+
+        delta = 1 if completed else -1
+        completed_lessons = progress['completed_lessons'] + delta
+        total_lessons = progress['total_lessons']
+        progress_percentage = (completed_lessons / total_lessons) * 100 if total_lessons > 0 else 0
+        progresses.update(
+            completed_lessons=F('completed_lessons') + delta,
+            progress_percentage=progress_percentage
+        )
+
+        deltas = stats_deltas()
+        add_progress_change(deltas, lesson.course_id, progress['progress_percentage'], progress_percentage)
+        apply_stats_deltas(deltas)
+
+
+def bulk_set_lesson_completion(user, completions, course_ids):
+    with transaction.atomic():
+        upsert(
+            LessonProgress,
+            [
+                LessonProgress(user=user, lesson_id=lesson_id, completed=completed)
+                for lesson_id, completed in completions.items()
+            ],
+            unique_fields=['user', 'lesson'],
+            update_fields=['completed']
+        )
+        transaction.on_commit(partial(bump_learner_version, user.pk))
+        return recalculate_user_course_progress(user, course_ids)
+
+
+def bump_learner_versions(user_ids):
+    for user_id in user_ids:
+        bump_learner_version(user_id)
+
+
+def bump_learners_on_commit(*querysets):
+    # One read of the affected learners before their rows are deleted, and
+    # one bump per learner once the delete commits.
+    user_ids = set()
+    for queryset in querysets:
+        user_ids.update(queryset.values_list('user_id', flat=True).distinct())
+    if user_ids:
+        transaction.on_commit(partial(bump_learner_versions, user_ids))
+
+
+def enroll_cohort(course, emails=(), user_ids=()):
+    # Fixed query count regardless of cohort size: one lookup for the learners,
+    # one for existing enrollments, one for existing progress, one for prior
+    # completions, one bulk insert and one upsert.
+    users = list(
+        AppUser.objects.filter(Q(email__in=emails) | Q(pk__in=user_ids)).values('id', 'email')
+    )
+    found_emails = {user['email'].lower() for user in users}
+    found_ids = {user['id'] for user in users}
+    not_found = (
+        [email for email in emails if email.lower() not in found_emails]
+        + [user_id for user_id in user_ids if user_id not in found_ids]
+    )
+
+    with transaction.atomic():
+        # EnrollCourseView takes the same lock, so no enrollment can land
+        # between the reads below and the inserts that rely on them.
+        Course.objects.select_for_update().filter(pk=course.pk).first()
+        already_enrolled_ids = set(
+            Enrollment.objects.filter(course=course, user_id__in=found_ids).values_list('user_id', flat=True)
+        )
+        enrolled = [user for user in users if user['id'] not in already_enrolled_ids]
+        enrolled_ids = [user['id'] for user in enrolled]
+
+        # Progress left over from an earlier enrollment is already counted in
+        # the course stats; it is recomputed below and moves between buckets.
+        previous = dict(
+            CourseProgress.objects.select_for_update().filter(
+                course=course, user_id__in=enrolled_ids
+            ).values_list('user_id', 'progress_percentage')
+        )
+        total_lessons = course.lessons.count()
+        completed = dict(
+            LessonProgress.objects.filter(
+                user_id__in=enrolled_ids, lesson__course=course, completed=True
+            ).values('user_id').annotate(
+                done=Count('lesson_id', distinct=True)
+            ).values_list('user_id', 'done')
+        )
+        percentages = {
+            user_id: (completed.get(user_id, 0) / total_lessons) * 100 if total_lessons > 0 else 0
+            for user_id in enrolled_ids
+        }
+
+        Enrollment.objects.bulk_create([Enrollment(user_id=user_id, course=course) for user_id in enrolled_ids])
+        upsert(
+            CourseProgress,
+            [
+                CourseProgress(
+                    user_id=user_id,
+                    course=course,
+                    total_lessons=total_lessons,
+                    completed_lessons=completed.get(user_id, 0),
+                    progress_percentage=percentages[user_id]
+                )
+                for user_id in enrolled_ids
+            ],
+            unique_fields=['user', 'course'],
+            update_fields=['completed_lessons', 'total_lessons', 'progress_percentage']
+        )
+        # bulk_create sends no post_save, so neither the enrollment signals nor
+        # the course stats see these rows unless told here.
+        deltas = stats_deltas()
+        deltas[course.course_id]['enrolled_count'] += len(enrolled_ids)
+        for user_id in enrolled_ids:
+            add_progress_change(deltas, course.course_id, previous.get(user_id), percentages[user_id])
+        apply_stats_deltas(deltas)
+        transaction.on_commit(partial(bump_learner_versions, enrolled_ids))
+
+    return {
+        'enrolled': enrolled,
+        'already_enrolled': [user for user in users if user['id'] in already_enrolled_ids],
+        'not_found': not_found,
+    }
+
+
+def recompute_course_progress(course_id, batch_size=PROGRESS_RECOMPUTE_BATCH_SIZE):
+    total_lessons = Lesson.objects.filter(course_id=course_id).count()
+
+    recomputed = 0
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            # Lock the batch before counting so a concurrent toggle's F() update
+            # lands either fully before or fully after this write.
+            batch = list(
+                CourseProgress.objects.select_for_update()
+                .filter(course_id=course_id, id__gt=last_id)
+                .order_by('id')[:batch_size]
+            )
+            if not batch:
+                break
+
+            completed = dict(
+                LessonProgress.objects.filter(
+                    lesson__course_id=course_id,
+                    completed=True,
+                    user_id__in=[progress.user_id for progress in batch]
+                ).values('user_id').annotate(
+                    done=Count('lesson_id', distinct=True)
+                ).values_list('user_id', 'done')
+            )
+            deltas = stats_deltas()
+            changed_user_ids = []
+            for progress in batch:
+                old = (progress.total_lessons, progress.completed_lessons, progress.progress_percentage)
+                progress.total_lessons = total_lessons
+                progress.completed_lessons = completed.get(progress.user_id, 0)
+                progress.progress_percentage = (
+                    (progress.completed_lessons / total_lessons) * 100 if total_lessons > 0 else 0
+                )
+                add_progress_change(deltas, course_id, old[2], progress.progress_percentage)
+                if old != (progress.total_lessons, progress.completed_lessons, progress.progress_percentage):
+                    changed_user_ids.append(progress.user_id)
+            CourseProgress.objects.bulk_update(
+                batch, ['total_lessons', 'completed_lessons', 'progress_percentage']
+            )
+            apply_stats_deltas(deltas)
+            # bulk_update sends no signals; the dashboard ETag must still change.
+            if changed_user_ids:
+                transaction.on_commit(partial(bump_learner_versions, changed_user_ids))
+
+        recomputed += len(batch)
+        last_id = batch[-1].id
+
+    return recomputed
+
+
+def write_lesson_ranks(course_id, lesson_ids):
+    lessons = Lesson.objects.filter(course_id=course_id)
+    highest_rank = lessons.aggregate(max_rank=Max('rank'))['max_rank'] or 0
+
+    # Park every row above both the current and the target range, then write
+    # the evenly spaced ranks in one CASE update without any collisions.
+    lessons.update(rank=F('rank') + max(highest_rank, len(lesson_ids) * LESSON_RANK_GAP))
+    lessons.update(rank=Case(
+        *[When(lesson_id=lesson_id, then=Value(position * LESSON_RANK_GAP))
+          for position, lesson_id in enumerate(lesson_ids, start=1)]
+    ))
+    transaction.on_commit(bump_catalog_version)
+
+
+class LessonOrderMismatch(Exception):
+    pass
+
+
+def reorder_lessons(course_id, lesson_ids):
+    with transaction.atomic():
+        # Same lock as lesson inserts and respace_lesson_ranks: the CASE in
+        # write_lesson_ranks has no default, so a lesson added after this check
+        # would have its rank written as NULL.
+        Course.objects.select_for_update().filter(course_id=course_id).first()
+        course_lesson_ids = set(Lesson.objects.filter(course_id=course_id).values_list('lesson_id', flat=True))
+        if set(lesson_ids) != course_lesson_ids:
+            raise LessonOrderMismatch('Lessons must list every lesson in this course exactly once.')
+        write_lesson_ranks(course_id, lesson_ids)
+
+
+def respace_lesson_ranks(course_id):
+    with transaction.atomic():
+        Course.objects.select_for_update().filter(course_id=course_id).first()
+        lesson_ids = list(
+            Lesson.objects.filter(course_id=course_id).order_by('rank').values_list('lesson_id', flat=True)
+        )
+        write_lesson_ranks(course_id, lesson_ids)
+
+
+def rank_for_position(course_id, position):
+    neighbours = list(
+        Lesson.objects.filter(course_id=course_id).order_by('rank')
+        .values_list('rank', flat=True)[max(position - 2, 0):position]
+    )
+    if position == 1:
+        before, after = 0, (neighbours[0] if neighbours else None)
+    else:
+        before = neighbours[0] if neighbours else 0
+        after = neighbours[1] if len(neighbours) > 1 else None
+
+    if after is None:
+        return before + LESSON_RANK_GAP
+
+    if after - before < 2:
+        # The gap is used up: respace the course now so the insert can go ahead.
+        respace_lesson_ranks(course_id)
+        return rank_for_position(course_id, position)
+
+    rank = (before + after) // 2
+    if min(rank - before, after - rank) < 2:
+        # The next insert here would find no room, so respace after this one lands.
+        run_on_commit(respace_lesson_ranks, course_id)
+    return rank
+
+
+def get_completed_lesson_ids(user, course_id):
+    return set(
+        LessonProgress.objects.filter(
+            user=user, lesson__course_id=course_id, completed=True
+        ).values_list('lesson_id', flat=True)
+    )
+
+
+def get_next_lessons(user, course_ids):
+    # First lesson by rank that the user has not completed, per course, in one
+    # query: rank the open lessons ahead of the completed ones and keep row one.
+    completed = LessonProgress.objects.filter(user=user, lesson=OuterRef('pk'), completed=True)
+    lessons = Lesson.objects.filter(course_id__in=course_ids).with_display_order().annotate(
+        completed=Exists(completed),
+        open_position=Window(
+            expression=RowNumber(),
+            partition_by=[F('course_id')],
+            order_by=[F('completed').asc(), F('rank').asc()],
+        )
+    ).filter(open_position=1)
+    # Checked here rather than in filter(): a WHERE on completed would run
+    # before the windows and renumber display_order over the open lessons only.
+    return {lesson.course_id: lesson for lesson in lessons if not lesson.completed}
+
+
+def sweep_visibility_transitions(now=None):
+    now = now or timezone.now()
+    with transaction.atomic():
+        due = Course.objects.filter(next_visibility_transition_at__lte=now)
+
+        shown = due.filter(
+            Q(visibility_start_date__lte=now),
+            Q(visibility_end_date__isnull=True) | Q(visibility_end_date__gte=now),
+            is_visible=False
+        ).update(is_visible=True, updated_at=now)
+        hidden = due.filter(
+            visibility_end_date__lt=now,
+            is_visible=True
+        ).update(is_visible=False, updated_at=now)
+
+        due.update(next_visibility_transition_at=Case(
+            When(visibility_start_date__gte=now, then=F('visibility_start_date')),
+            When(visibility_end_date__gte=now, then=F('visibility_end_date')),
+            default=Value(None),
+            output_field=DateTimeField(),
+        ))
+
+        if shown or hidden:
+            transaction.on_commit(bump_catalog_version)
+
+    return shown + hidden
@@ -1,8 +1,7 @@
 # backend/content/views.py
-import mimetypes
+import logging
 import os
 import re
-from wsgiref.util import FileWrapper
 from django.core.files.storage import default_storage
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.conf import settings
@@ -13,8 +12,10 @@ from django.core.validators import validate_email
 from django.core.exceptions import PermissionDenied
 from django.db import transaction
 from django.forms import ValidationError
-from django.http import FileResponse, Http404
+from django.http import Http404
 from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import method_decorator
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework import status, viewsets
 from rest_framework.authtoken.models import Token
@@ -23,35 +24,88 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from django.db.models import Q
-from django.utils import timezone
+from django.db.models import Exists, F, FilteredRelation, OuterRef, Q, Value
+from django.db.models.functions import Coalesce
 from django.utils.dateparse import parse_datetime
-from django.db.models import Max 
 
 from .models import (
     AppUser,
     Course,
     CourseProgress,
+    CourseStats,
     EmailVerificationToken,
     Event,
     Lesson,
     LessonProgress,
     LessonResource,
     Enrollment,
+    ResourceUploadSession,
+)
+from .blobs import releasing_resource_files
+from .bundles import bundle_response
+from .catalog import get_catalog_snapshot
+from .derivatives import pick_preview, schedule_derivatives
+from .conditional import (
+    conditional,
+    course_lessons_etag,
+    learner_courses_etag,
+    lesson_resources_etag,
+    lesson_resources_last_modified,
+)
+from .pagination import (
+    CourseCreatedPagination,
+    CourseSearchPagination,
+    CourseTitlePagination,
+    DashboardPagination,
+    EventStartPagination,
+    ResourceUploadedPagination,
 )
 from .permissions import IsAdmin
+from .search import level_facets, search_courses
+from .serving import serve_derivative_file, serve_resource_file
 from .serializers import (
+    BulkLessonProgressSerializer,
+    CohortEnrollmentSerializer,
     CourseProgressSerializer,
+    CourseSearchSerializer,
+    CourseStatsSerializer,
     CourseSerializer,
+    DashboardEnrollmentSerializer,
     EmailVerificationSerializer,
     EventSerializer,
     LessonResourceBulkSerializer,
     LessonResourceSerializer,
+    LessonReorderSerializer,
     LessonSerializer,
     ResendVerificationSerializer,
+    ResourceUploadSessionSerializer,
     UserSerializer,
     InstructorCourseSerializer,
 )
+from .tasks import run_on_commit
+from .uploads import (
+    ChunkRejected,
+    UploadOffsetMismatch,
+    discard_part,
+    finalize_upload,
+    parse_chunk_checksum,
+    write_chunk,
+)
+from .utils import (
+    LessonOrderMismatch,
+    bulk_set_lesson_completion,
+    bump_learners_on_commit,
+    calculate_course_progress,
+    enroll_cohort,
+    get_completed_lesson_ids,
+    get_next_lessons,
+    recompute_course_progress,
+    reorder_lessons,
+    rank_for_position,
+    set_lesson_completion,
+)
+
+logger = logging.getLogger(__name__)
 
 class UserViewSet(viewsets.ModelViewSet):
     queryset = AppUser.objects.all()
@@ -413,16 +467,9 @@ class CourseViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         if self.request.user.role == 'admin':
-            return Course.objects.all()
+            return Course.objects.select_related('instructor')
         
-        now = timezone.now()
-        return Course.objects.filter(
-            Q(is_visible=True) &
-            (
-                (Q(visibility_start_date__isnull=True) & Q(visibility_end_date__isnull=True)) |
-                (Q(visibility_start_date__lte=now) & Q(visibility_end_date__gte=now))
-            )
-        )
+        return Course.objects.filter(is_visible=True)
 
 class EnrollCourseView(APIView):
     permission_classes = [IsAuthenticated]
@@ -435,24 +482,22 @@ class EnrollCourseView(APIView):
     
     def post(self, request, course_id):
         try:
-            course = get_object_or_404(Course, course_id=course_id)
-            
-            if Enrollment.objects.filter(user=request.user, course=course).exists():
-                return Response(
-                    {"error": "You are already enrolled in this course"}, 
-                    status=status.HTTP_400_BAD_REQUEST
+            with transaction.atomic():
+                # Locked like enroll_cohort, which reads enrollments before
+                # inserting its batch.
+                course = get_object_or_404(Course.objects.select_for_update(), course_id=course_id)
+
+                if Enrollment.objects.filter(user=request.user, course=course).exists():
+                    return Response(
+                        {"error": "You are already enrolled in this course"}, 
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+
+                enrollment = Enrollment.objects.create(
+                    user=request.user,
+                    course=course
                 )
-            
-            enrollment = Enrollment.objects.create(
-                user=request.user,
-                course=course
-            )
-            
-            CourseProgress.objects.create(
-                user=request.user,
-                course=course,
-                progress_percentage=0.0
-            )
+                calculate_course_progress(request.user, course)
             
             return Response(
                 {"message": "Successfully enrolled in the course"},
@@ -473,41 +518,93 @@ class EnrollCourseView(APIView):
 class EnrolledCoursesView(ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = CourseSerializer
+    pagination_class = CourseTitlePagination
     
+    @method_decorator(conditional(etag_func=learner_courses_etag))
+    def list(self, request, *args, **kwargs):
+        enrolled_ids = set(
+            Enrollment.objects.filter(user=request.user).values_list('course_id', flat=True)
+        )
+        courses = [
+            course for course in get_catalog_snapshot()
+            if course['course_id'] in enrolled_ids
+        ]
+        page = self.paginator.paginate_snapshot(courses, request)
+        return self.get_paginated_response(page)
+
+class LearnerDashboardView(ListAPIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = DashboardEnrollmentSerializer
+    pagination_class = DashboardPagination
+
     def get_queryset(self):
-        now = timezone.now()
-        return Course.objects.filter(
-            enrolled_users__user=self.request.user
-        ).filter(
-            Q(is_visible=True) &
-            (
-                (Q(visibility_start_date__isnull=True) & Q(visibility_end_date__isnull=True)) |
-                (Q(visibility_start_date__lte=now) & Q(visibility_end_date__gte=now))
-            )
-        ).order_by('title')
+        user = self.request.user
+        return Enrollment.objects.filter(user=user).select_related('course__instructor').annotate(
+            course_title=F('course__title'),
+            progress=FilteredRelation('course__courseprogress', condition=Q(course__courseprogress__user=user)),
+            progress_percentage=Coalesce(F('progress__progress_percentage'), Value(0.0)),
+            completed_lessons=Coalesce(F('progress__completed_lessons'), Value(0)),
+            total_lessons=Coalesce(F('progress__total_lessons'), Value(0)),
+        )
+
+    @method_decorator(conditional(etag_func=learner_courses_etag))
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True, context={
+            **self.get_serializer_context(),
+            'next_lessons': get_next_lessons(request.user, [enrollment.course_id for enrollment in page]),
+        })
+        return self.get_paginated_response(serializer.data)
 
 class AvailableCoursesView(ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = CourseSerializer
+    pagination_class = CourseTitlePagination
 
     def get_queryset(self):
-        now = timezone.now()
-        enrolled_courses = Enrollment.objects.filter(
-            user=self.request.user
-        ).values_list('course_id', flat=True)
-        
+        enrolled = Enrollment.objects.filter(user=self.request.user, course=OuterRef('pk'))
         queryset = Course.objects.filter(
+            ~Exists(enrolled),
             is_visible=True
-        ).filter(
-            Q(visibility_start_date__isnull=True, visibility_end_date__isnull=True) |
-            Q(visibility_start_date__lte=now, visibility_end_date__gte=now)
-        ).order_by('title')
-        
-        print("Available courses query:", queryset.query)
-        print("Number of available courses:", queryset.count())
-        
+        ).select_related('instructor')
+
+        if settings.CONTENT_QUERY_DEBUG:
+            logger.debug("Available courses query for user %s: %s", self.request.user.pk, queryset.query)
+
         return queryset
-       
+
+    @method_decorator(conditional(etag_func=learner_courses_etag))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+class CourseSearchView(ListAPIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = CourseSearchSerializer
+    pagination_class = CourseSearchPagination
+
+    def get_queryset(self):
+        queryset = Course.objects.select_related('instructor')
+        if self.request.user.role != 'admin':
+            queryset = queryset.filter(is_visible=True)
+        return search_courses(self.search_query, queryset)
+
+    def list(self, request, *args, **kwargs):
+        self.search_query = request.query_params.get('q', '').strip()
+        if not self.search_query:
+            return Response({"error": "A search query 'q' is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        courses = self.get_queryset()
+        # Facet counts cover every match so the client can show what a level filter would leave.
+        facets = level_facets(courses)
+        level = request.query_params.get('level')
+        if level:
+            courses = courses.filter(level=level)
+
+        page = self.paginate_queryset(courses)
+        response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+        response.data['facets'] = {'level': facets}
+        return response
+
 class EventViewSet(viewsets.ModelViewSet):
     queryset = Event.objects.all()
     serializer_class = EventSerializer
@@ -516,11 +613,15 @@ class EventViewSet(viewsets.ModelViewSet):
 class CourseLessonsView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @method_decorator(conditional(etag_func=course_lessons_etag))
     def get(self, request, course_id):
-        lessons = Lesson.objects.filter(course_id=course_id).order_by('order')
-        if not lessons.exists():
+        lessons = list(Lesson.objects.filter(course_id=course_id).with_display_order())
+        if not lessons:
             return Response({"error": "No lessons found for this course."}, status=status.HTTP_404_NOT_FOUND)
-        serializer = LessonSerializer(lessons, many=True, context={'request': request})
+        serializer = LessonSerializer(lessons, many=True, context={
+            'request': request,
+            'completed_lesson_ids': get_completed_lesson_ids(request.user, course_id),
+        })
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 class UpdateLessonProgressView(APIView):
@@ -528,50 +629,75 @@ class UpdateLessonProgressView(APIView):
 
     def post(self, request, lesson_id):
         user = request.user
-        lesson = get_object_or_404(Lesson, lesson_id=lesson_id)
+        lesson = get_object_or_404(Lesson.objects.select_related('course'), lesson_id=lesson_id)
         
-        lesson_progress, _ = LessonProgress.objects.get_or_create(user=user, lesson=lesson)
         completed = request.data.get('completed', False)
         if not isinstance(completed, bool):
             return Response({"error": "Invalid value for 'completed'. Must be boolean."}, 
                           status=status.HTTP_400_BAD_REQUEST)
         
-        lesson_progress.completed = completed
-        lesson_progress.save()
-
-        self.update_course_progress(user, lesson.course)
+        set_lesson_completion(user, lesson, completed)
         return Response({"message": "Lesson progress updated successfully."}, 
                       status=status.HTTP_200_OK)
 
-    def update_course_progress(self, user, course):
-        lessons = Lesson.objects.filter(course=course)
-        total_lessons = lessons.count()
-        completed_lessons = LessonProgress.objects.filter(
-            user=user, lesson__in=lessons, completed=True
-        ).count()
-
-        progress_percentage = (completed_lessons / total_lessons) * 100 if total_lessons > 0 else 0
-        CourseProgress.objects.update_or_create(
-            user=user, course=course,
-            defaults={'progress_percentage': progress_percentage}
+class BulkUpdateLessonProgressView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = BulkLessonProgressSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        completions = {
+            entry['lesson_id']: entry['completed']
+            for entry in serializer.validated_data['lessons']
+        }
+        lesson_courses = dict(
+            Lesson.objects.filter(lesson_id__in=completions.keys()).values_list('lesson_id', 'course_id')
         )
+        missing = sorted(set(completions) - set(lesson_courses))
+        if missing:
+            return Response(
+                {"error": "Lessons not found.", "lesson_ids": missing},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        course_ids = sorted(set(lesson_courses.values()))
+        progress = bulk_set_lesson_completion(request.user, completions, course_ids)
+        return Response({
+            "message": "Lesson progress updated successfully.",
+            "progress": [
+                {"course_id": course_id, "progress_percentage": progress[course_id]}
+                for course_id in course_ids
+            ]
+        }, status=status.HTTP_200_OK)
 
 class GetCourseProgressView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, course_id):
-        course = get_object_or_404(Course, course_id=course_id)
-        course_progress = get_object_or_404(CourseProgress, user=request.user, course=course)
+        course_progress = get_object_or_404(
+            CourseProgress.objects.select_related('course__instructor', 'user'),
+            user=request.user,
+            course_id=course_id
+        )
         serializer = CourseProgressSerializer(course_progress)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 class LessonResourcesView(ListAPIView):
     serializer_class = LessonResourceSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = ResourceUploadedPagination
 
     def get_queryset(self):
         lesson_id = self.kwargs.get('lesson_id')
-        return LessonResource.objects.filter(lesson_id=lesson_id).order_by('uploaded_at')
+        return LessonResource.objects.filter(lesson_id=lesson_id)
+
+    @method_decorator(conditional(
+        etag_func=lesson_resources_etag, last_modified_func=lesson_resources_last_modified
+    ))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
 class ResourcePreviewView(APIView):
     permission_classes = [IsAuthenticated]
@@ -586,21 +712,27 @@ class ResourcePreviewView(APIView):
                     status=status.HTTP_403_FORBIDDEN
                 )
             
-            file_path = resource.file.path
-            content_type, _ = mimetypes.guess_type(file_path)
-            
-            if not content_type:
-                content_type = 'application/octet-stream'
-            
-            response = FileResponse(
-                FileWrapper(open(file_path, 'rb')),
-                content_type=content_type
+            width = request.query_params.get('width')
+            derivative = pick_preview(
+                resource,
+                resource.derivatives.all(),
+                width=int(width) if width and width.isdigit() else None,
+                accept_webp='image/webp' in request.headers.get('Accept', ''),
             )
-            
+            if derivative:
+                response = serve_derivative_file(request, derivative)
+            else:
+                response = serve_resource_file(request, resource)
+            patch_vary_headers(response, ['Accept'])
             return response
             
         except LessonResource.DoesNotExist:
             raise Http404("Resource not found")
+        except FileNotFoundError:
+            return Response(
+                {"error": "File not found"}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
         except Exception as e:
             return Response(
                 {"error": str(e)}, 
@@ -620,30 +752,18 @@ class ResourceDownloadView(APIView):
                     status=status.HTTP_404_NOT_FOUND
                 )
             
-            file_path = resource.file.path
-            
-            if not os.path.exists(file_path):
-                return Response(
-                    {"error": "File not found"}, 
-                    status=status.HTTP_404_NOT_FOUND
-                )
-
             original_extension = os.path.splitext(resource.file.name)[1]
             download_filename = f"{resource.title}{original_extension}"
             
             download_filename = "".join(c for c in download_filename if c.isalnum() or c in (' ', '-', '_', '.'))
             
-            file_handle = open(file_path, 'rb')
-            response = FileResponse(file_handle)
-            
-            content_type, encoding = mimetypes.guess_type(file_path)
-            if content_type:
-                response['Content-Type'] = content_type
-            
-            response['Content-Disposition'] = f'attachment; filename="{download_filename}"'
-            
-            return response
-            
+            return serve_resource_file(request, resource, download_filename=download_filename)
+
+        except FileNotFoundError:
+            return Response(
+                {"error": "File not found"}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
         except Exception as e:
             print(f"Download error: {str(e)}")
             return Response(
@@ -651,6 +771,28 @@ class ResourceDownloadView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
         
+class LessonResourceBundleView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, lesson_id):
+        lesson = get_object_or_404(Lesson, lesson_id=lesson_id)
+        resources = LessonResource.objects.filter(lesson=lesson).order_by('uploaded_at', 'id')
+        if not resources.exists():
+            return Response({"error": "This lesson has no resources"}, status=status.HTTP_404_NOT_FOUND)
+        return bundle_response(resources.iterator(), lesson.title)
+
+class CourseResourceBundleView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, course_id):
+        course = get_object_or_404(Course, course_id=course_id)
+        resources = LessonResource.objects.filter(lesson__course=course).select_related('lesson').order_by(
+            'lesson__rank', 'uploaded_at', 'id'
+        )
+        if not resources.exists():
+            return Response({"error": "This course has no resources"}, status=status.HTTP_404_NOT_FOUND)
+        return bundle_response(resources.iterator(), course.title, by_lesson=True)
+        
 # Admin Views
 class AdminUserListView(ListAPIView):
     permission_classes = [IsAdmin]
@@ -680,14 +822,23 @@ class AdminCourseViewSet(viewsets.ModelViewSet):
 class AdminListCoursesView(ListAPIView):
     permission_classes = [IsAdmin]
     serializer_class = InstructorCourseSerializer
+    pagination_class = CourseCreatedPagination
     
     def get_queryset(self):
-        return Course.objects.filter(instructor=self.request.user)
+        return Course.objects.filter(instructor=self.request.user).select_related('instructor')
+
+class AdminCourseStatsView(ListAPIView):
+    permission_classes = [IsAdmin]
+    serializer_class = CourseStatsSerializer
+
+    def get_queryset(self):
+        return CourseStats.objects.filter(course__instructor=self.request.user)
 
 class AdminListEventsView(ListAPIView):
     permission_classes = [IsAdmin]
     queryset = Event.objects.all()
     serializer_class = EventSerializer
+    pagination_class = EventStartPagination
 
 class AdminAddCourseView(CreateAPIView):
     permission_classes = [IsAdmin]
@@ -705,22 +856,17 @@ class AdminRemoveCourseView(DestroyAPIView):
         return Course.objects.filter(instructor=self.request.user)
 
     def perform_destroy(self, instance):
-        if instance.instructor != self.request.user:
+        if instance.instructor_id != self.request.user.pk:
             raise PermissionDenied("You can only delete your own courses.")
         
-        with transaction.atomic():
-            lessons = Lesson.objects.filter(course=instance)
-            for lesson in lessons:
-                resources = LessonResource.objects.filter(lesson=lesson)
-                for resource in resources:
-                    if resource.file:
-                        file_path = os.path.join(settings.MEDIA_ROOT, str(resource.file))
-                        if os.path.exists(file_path):
-                            os.remove(file_path)  
-                    resource.delete()
-                
-                lesson.delete() 
-            instance.delete()  
+        with transaction.atomic(), releasing_resource_files(
+            LessonResource.objects.filter(lesson__course=instance)
+        ):
+            bump_learners_on_commit(
+                Enrollment.objects.filter(course=instance),
+                LessonProgress.objects.filter(lesson__course=instance),
+            )
+            instance.delete()
 
 
 
@@ -731,7 +877,7 @@ class AdminUpdateCourseVisibilityView(APIView):
         try:
             course = get_object_or_404(Course, course_id=course_id)
             
-            if course.instructor != request.user:
+            if course.instructor_id != request.user.pk:
                 raise PermissionDenied("You can only update your own courses.")
             
             is_visible = request.data.get('is_visible')
@@ -760,7 +906,7 @@ class AdminUpdateCourseView(APIView):
         try:
             course = get_object_or_404(Course, course_id=course_id)
             
-            if course.instructor != request.user:
+            if course.instructor_id != request.user.pk:
                 raise PermissionDenied("You can only update your own courses.")
             
             serializer = InstructorCourseSerializer(
@@ -802,25 +948,20 @@ class AdminAddLessonView(CreateAPIView):
         if not course_id:
             raise ValidationError({"error": "course is required."})
         
-        course = get_object_or_404(Course, course_id=course_id)
         requested_order = int(self.request.data.get('order'))
 
-        highest_order = Lesson.objects.filter(course=course).aggregate(
-            max_order=Max('order'))['max_order'] or 0
+        with transaction.atomic():
+            course = get_object_or_404(Course.objects.select_for_update(), course_id=course_id)
 
-        new_order = max(1, min(requested_order, highest_order + 1))
+            lesson_count = Lesson.objects.filter(course=course).count()
+            new_order = max(1, min(requested_order, lesson_count + 1))
 
-        with transaction.atomic():
-            affected_lessons = Lesson.objects.filter(
+            serializer.save(
                 course=course,
-                order__gte=new_order
-            ).order_by('-order')  
-
-            for lesson in affected_lessons:
-                lesson.order += 1
-                lesson.save()
-            
-            serializer.save(course=course, order=new_order)
+                display_order=new_order,
+                rank=rank_for_position(course.course_id, new_order)
+            )
+            run_on_commit(recompute_course_progress, course.course_id)
 
 class AdminRemoveLessonView(DestroyAPIView):
     permission_classes = [IsAdmin]
@@ -828,33 +969,55 @@ class AdminRemoveLessonView(DestroyAPIView):
     lookup_field = 'lesson_id'
 
     def perform_destroy(self, instance):
-        course = instance.course
-        deleted_order = instance.order
+        with transaction.atomic(), releasing_resource_files(LessonResource.objects.filter(lesson=instance)):
+            run_on_commit(recompute_course_progress, instance.course_id)
+            bump_learners_on_commit(LessonProgress.objects.filter(lesson=instance))
+            instance.delete()
 
-        with transaction.atomic():
-            resources = LessonResource.objects.filter(lesson=instance)
-            for resource in resources:
-                if resource.file:
-                    file_path = os.path.join(settings.MEDIA_ROOT, str(resource.file))
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
+class AdminReorderLessonsView(APIView):
+    permission_classes = [IsAdmin]
 
-            instance.delete()
+    def put(self, request, course_id):
+        course = get_object_or_404(Course, course_id=course_id)
 
-            lessons_to_update = Lesson.objects.filter(
-                course=course,
-                order__gt=deleted_order
-            ).order_by('order')
+        if course.instructor_id != request.user.pk:
+            raise PermissionDenied("You can only update your own courses.")
 
-            for lesson in lessons_to_update:
-                lesson.order -= 1
-                lesson.save()
+        serializer = LessonReorderSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-            all_lessons = Lesson.objects.filter(course=course).order_by('order')
-            for index, lesson in enumerate(all_lessons, start=1):
-                if lesson.order != index:
-                    lesson.order = index
-                    lesson.save()
+        try:
+            reorder_lessons(course.course_id, serializer.validated_data['lessons'])
+        except LessonOrderMismatch as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        lessons = Lesson.objects.filter(course=course).with_display_order()
+        response_serializer = LessonSerializer(lessons, many=True, context={
+            'request': request,
+            'completed_lesson_ids': get_completed_lesson_ids(request.user, course.course_id),
+        })
+        return Response(response_serializer.data, status=status.HTTP_200_OK)
+
+class AdminEnrollCohortView(APIView):
+    permission_classes = [IsAdmin]
+
+    def post(self, request, course_id):
+        course = get_object_or_404(Course, course_id=course_id)
+
+        if course.instructor_id != request.user.pk:
+            raise PermissionDenied("You can only enroll learners in your own courses.")
+
+        serializer = CohortEnrollmentSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        result = enroll_cohort(
+            course,
+            emails=serializer.validated_data['emails'],
+            user_ids=serializer.validated_data['user_ids']
+        )
+        return Response(result, status=status.HTTP_200_OK)
 
 class AddLessonResourceView(CreateAPIView):
     permission_classes = [IsAdmin]
@@ -864,6 +1027,7 @@ class AddLessonResourceView(CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         resources = serializer.save()
+        schedule_derivatives(resources)
         
         response_serializer = LessonResourceSerializer(resources, many=True)
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
@@ -874,9 +1038,83 @@ class DeleteLessonResourceView(DestroyAPIView):
     lookup_field = 'id'
 
     def perform_destroy(self, instance):
-        if instance.file:
-            file_path = os.path.join(settings.MEDIA_ROOT, str(instance.file))
-            if os.path.exists(file_path):
-                os.remove(file_path)
-            
-        instance.delete()
\ No newline at end of file
+        with transaction.atomic(), releasing_resource_files(LessonResource.objects.filter(pk=instance.pk)):
+            instance.delete()
+
+class ResourceUploadSessionCreateView(CreateAPIView):
+    permission_classes = [IsAdmin]
+    serializer_class = ResourceUploadSessionSerializer
+
+    def perform_create(self, serializer):
+        serializer.save(created_by=self.request.user)
+
+
+class ResourceUploadSessionView(APIView):
+    """GET reports the resume offset, PUT appends a chunk at Upload-Offset, DELETE abandons the upload."""
+    permission_classes = [IsAdmin]
+
+    def get_session(self, upload_id, lock=False):
+        sessions = ResourceUploadSession.objects.filter(created_by=self.request.user)
+        if lock:
+            sessions = sessions.select_for_update()
+        return get_object_or_404(sessions, pk=upload_id)
+
+    def offset_response(self, session, status_code=status.HTTP_200_OK, error=None):
+        data = ResourceUploadSessionSerializer(session).data
+        if error:
+            data['error'] = error
+        response = Response(data, status=status_code)
+        response['Upload-Offset'] = session.received
+        return response
+
+    def get(self, request, upload_id):
+        return self.offset_response(self.get_session(upload_id))
+
+    def put(self, request, upload_id):
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers['Content-Length'])
+        except (KeyError, ValueError):
+            return Response(
+                {'error': 'Upload-Offset and Content-Length headers are required.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        session = self.get_session(upload_id)
+        try:
+            # Read the raw body as it arrives instead of buffering it.
+            write_chunk(
+                session, request.stream, offset, length,
+                parse_chunk_checksum(request.headers.get('Upload-Checksum'))
+            )
+        except ResourceUploadSession.DoesNotExist:
+            raise Http404
+        except UploadOffsetMismatch as e:
+            return self.offset_response(session, status.HTTP_409_CONFLICT, str(e))
+        except ChunkRejected as e:
+            return self.offset_response(session, status.HTTP_400_BAD_REQUEST, str(e))
+        return self.offset_response(session)
+
+    def delete(self, request, upload_id):
+        with transaction.atomic():
+            session = self.get_session(upload_id, lock=True)
+            discard_part(session)
+            session.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ResourceUploadCompleteView(APIView):
+    permission_classes = [IsAdmin]
+
+    def post(self, request, upload_id):
+        with transaction.atomic():
+            session = get_object_or_404(
+                ResourceUploadSession.objects.select_for_update().select_related('lesson'),
+                pk=upload_id, created_by=request.user
+            )
+            try:
+                resource = finalize_upload(session)
+            except ChunkRejected as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            schedule_derivatives([resource])
+        return Response(LessonResourceSerializer(resource).data, status=status.HTTP_201_CREATED)
\ No newline at end of file
@@ -27,12 +27,15 @@ import {
   addAdminLesson,
   removeAdminLesson,
   addLessonResource,
+  uploadLessonResource,
 } from "../../services/api";
 import LessonStepContent from "./LessonStepContent";
 import LessonTable from "./LessonTable";
 import DeleteConfirmationDialog from "../DeleteConfirmationDialog";
 import SearchAndSort from "./SearchAndSort";
 
+const MULTIPART_UPLOAD_LIMIT = 10 * 1024 * 1024;
+
 const LessonManagement = ({ open, onClose, course }) => {
   const styles = {
     dialog: {
@@ -341,11 +344,25 @@ const LessonManagement = ({ open, onClose, course }) => {
 
       const lessonResponse = await addAdminLesson(lessonData);
 
-      if (validResources.length > 0) {
+      // Small files share one multipart request while it stays under the
+      // limit; the rest are sent as resumable uploads.
+      const smallResources = [];
+      const largeResources = [];
+      let multipartSize = 0;
+      validResources.forEach((resource) => {
+        if (multipartSize + resource.file.size <= MULTIPART_UPLOAD_LIMIT) {
+          multipartSize += resource.file.size;
+          smallResources.push(resource);
+        } else {
+          largeResources.push(resource);
+        }
+      });
+
+      if (smallResources.length > 0) {
         const formData = new FormData();
         formData.append("lesson", lessonResponse.lesson_id);
 
-        validResources.forEach((resource) => {
+        smallResources.forEach((resource) => {
           formData.append("titles", resource.title.trim());
           formData.append("resources", resource.file);
         });
@@ -353,6 +370,14 @@ const LessonManagement = ({ open, onClose, course }) => {
         await addLessonResource(formData);
       }
 
+      for (const resource of largeResources) {
+        await uploadLessonResource(
+          lessonResponse.lesson_id,
+          resource.title.trim(),
+          resource.file
+        );
+      }
+
       resetForm();
       fetchLessons(course.course_id);
     } catch (error) {
@@ -18,9 +18,9 @@ import {
 import { Description, CloudUpload, Delete, Add } from "@mui/icons-material";
 
 const ALLOWED_FILE_TYPES = ["pdf", "docx", "pptx", "jpg", "jpeg", "png"];
-const MAX_SINGLE_FILE_SIZE = 5 * 1024 * 1024;
+const MAX_SINGLE_FILE_SIZE = 500 * 1024 * 1024;
 const MAX_TITLE_LENGTH = 35;
-const MAX_TOTAL_FILE_SIZE = 20 * 1024 * 1024;
+const MAX_TOTAL_FILE_SIZE = 1024 * 1024 * 1024;
 
 const LessonStepContent = ({
   activeStep,
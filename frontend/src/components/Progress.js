@@ -17,7 +17,7 @@ import {
   Tooltip,
 } from "@mui/material";
 import { Search } from "@mui/icons-material";
-import { getCourseProgress, getEnrolledCourses } from "../services/api";
+import { getLearnerDashboard } from "../services/api";
 import ScrollToTop from "./ScrollToTop";
 
 const ProgressDashboard = () => {
@@ -37,22 +37,15 @@ const ProgressDashboard = () => {
   const fetchProgressData = async () => {
     try {
       setLoading(true);
-      const coursesList = await getEnrolledCourses();
+      const enrollments = await getLearnerDashboard();
+      const coursesList = enrollments.map((enrollment) => enrollment.course);
       setCourses(coursesList);
       setFilteredCourses(coursesList);
       setPage(1);
       const progressMap = {};
-      const progressPromises = coursesList.map(async (course) => {
-        try {
-          const progress = await getCourseProgress(course.course_id);
-          progressMap[course.course_id] = progress.progress_percentage;
-        } catch (error) {
-          console.error(`Error fetching progress for course ${course.course_id}:`, error);
-          progressMap[course.course_id] = 0;
-        }
+      enrollments.forEach((enrollment) => {
+        progressMap[enrollment.course.course_id] = enrollment.progress_percentage;
       });
-
-      await Promise.all(progressPromises);
       setProgressData(progressMap);
     } catch (error) {
       console.error("Error fetching progress data:", error);
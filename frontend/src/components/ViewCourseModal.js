@@ -39,6 +39,7 @@ import {
   getLessonResources,
   getResourcePreview,
   downloadResource,
+  downloadLessonResources,
 } from "../services/api";
 
 const PreviewContent = ({ resource }) => {
@@ -186,6 +187,20 @@ const LessonListItem = ({
     }
   };
 
+  const handleDownloadAll = async (event) => {
+    event.stopPropagation();
+    if (downloading) return;
+
+    setDownloading("all");
+    try {
+      await downloadLessonResources(lesson.lesson_id, lesson.title);
+    } catch (error) {
+      console.error("Error downloading resources:", error);
+    } finally {
+      setDownloading(null);
+    }
+  };
+
   const fetchResources = async (e) => {
     e.stopPropagation();
     if (!open) {
@@ -291,13 +306,32 @@ const LessonListItem = ({
 
       <Collapse in={open} timeout="auto" unmountOnExit>
         <Box sx={{ pl: 4, pr: 2, pb: 2 }}>
-          <Typography
-            variant="subtitle2"
-            gutterBottom
-            sx={{ pt: 1, fontWeight: "medium" }}
-          >
-            Resources
-          </Typography>
+          <Box sx={{ display: "flex", alignItems: "center", pt: 1 }}>
+            <Typography
+              variant="subtitle2"
+              gutterBottom
+              sx={{ fontWeight: "medium", flexGrow: 1 }}
+            >
+              Resources
+            </Typography>
+            {resources.length > 1 && (
+              <Tooltip title="Download all as ZIP" placement="top" arrow>
+                <span>
+                  <IconButton
+                    onClick={handleDownloadAll}
+                    disabled={downloading === "all"}
+                    size="small"
+                  >
+                    {downloading === "all" ? (
+                      <CircularProgress size={20} color="inherit" />
+                    ) : (
+                      <Download fontSize="small" />
+                    )}
+                  </IconButton>
+                </span>
+              </Tooltip>
+            )}
+          </Box>
           {loading ? (
             <Typography variant="body2">Loading resources...</Typography>
           ) : resources.length > 0 ? (
@@ -87,6 +87,17 @@ API.interceptors.response.use(
     }
 );
 
+// Follows cursor pagination links and returns every result as one array
+const getAllPages = async (url) => {
+    const results = [];
+    let next = url;
+    while (next) {
+        const response = await API.get(next);
+        results.push(...response.data.results);
+        next = response.data.next;
+    }
+    return results;
+};
 
 export const loginUser = async (email, password) => {
     try {
@@ -217,13 +228,11 @@ export const getUserRole = () => {
 };
 
 export const getEvents = async () => {
-    const response = await API.get("events/");
-    return response.data;
+    return getAllPages("events/");
 };
 
 export const getAdminEvents = async () => {
-    const response = await API.get("admin/events/");
-    return response.data;
+    return getAllPages("admin/events/");
 };
 
 export const addAdminEvent = async (eventData) => {
@@ -237,13 +246,20 @@ export const removeAdminEvent = async (eventId) => {
 };
 
 export const getCourses = async () => {
-    const response = await API.get("courses/");
+    return getAllPages("courses/");
+};
+
+export const searchCourses = async (query, { level, cursor } = {}) => {
+    // Returns one page: { results, next, previous, facets }. Pass `cursor` as the
+    // full `next`/`previous` URL from the previous page to keep paging.
+    const response = cursor
+        ? await API.get(cursor)
+        : await API.get('courses/search/', { params: { q: query, level } });
     return response.data;
 };
 
 export const getAvailableCourses = async () => {
-    const response = await API.get('courses/available/');
-    return response.data;
+    return getAllPages('courses/available/');
 };
 
 export const enrollCourse = async (courseId) => {
@@ -252,18 +268,20 @@ export const enrollCourse = async (courseId) => {
 };
 
 export const getEnrolledCourses = async () => {
-    const response = await API.get('courses/enrolled/');
-    return response.data;  
+    return getAllPages('courses/enrolled/');
 }
 export const getAdminCourses = async () => {
     try {
-      const response = await API.get("admin/courses/");
-      return response.data;
+      return await getAllPages("admin/courses/");
     } catch (error) {
       throw error;
     }
   };
 
+export const getAdminCourseStats = async () => {
+    return getAllPages("admin/courses/stats/");
+};
+
 export const addAdminCourse = async (courseData) => {
     const formattedData = {
         ...courseData,
@@ -318,8 +336,7 @@ export const updateAdminCourse = async (courseId, courseData) => {
 };
 
 export const getAdminUsers = async () => {
-    const response = await API.get("admin/users/");
-    return response.data;
+    return getAllPages("admin/users/");
 };
 
 export const updateLessonProgress = async (lessonId, completed) => {
@@ -327,6 +344,15 @@ export const updateLessonProgress = async (lessonId, completed) => {
     return response.data;
 };
 
+export const syncLessonProgress = async (lessons) => {
+    const response = await API.post('lessons/progress/bulk/', { lessons });
+    return response.data;
+};
+
+export const getLearnerDashboard = async () => {
+    return getAllPages('dashboard/');
+};
+
 export const getCourseProgress = async (courseId) => {
     const response = await API.get(`courses/${courseId}/progress/`);
     return response.data;
@@ -338,24 +364,38 @@ export const getLessonsForCourse = async (courseId) => {
 };
 
 export const getLessonResources = async (lessonId) => {
-    const response = await API.get(`lessons/${lessonId}/resources/`);
-    return response.data;
+    return getAllPages(`lessons/${lessonId}/resources/`);
 };
 
 export const getResourcePreview = async (resourceId) => {
+    // Lets the server answer image previews with a smaller WebP rendering.
     const response = await API.get(`resources/${resourceId}/preview/`, {
-        responseType: 'blob'
+        responseType: 'blob',
+        headers: { Accept: 'image/webp,*/*' }
     });
     return response.data;
 };
 
 export const downloadResource = async (resourceId, resourceTitle) => {
+    return downloadFile(`resources/${resourceId}/download/`, resourceTitle);
+};
+
+// ZIP of every resource in a lesson, streamed by the server as it is built.
+export const downloadLessonResources = async (lessonId, lessonTitle) => {
+    return downloadFile(`lessons/${lessonId}/resources/bundle/`, `${lessonTitle}.zip`);
+};
+
+export const downloadCourseResources = async (courseId, courseTitle) => {
+    return downloadFile(`courses/${courseId}/resources/bundle/`, `${courseTitle}.zip`);
+};
+
+const downloadFile = async (url, fallbackFilename) => {
     try {
-        const response = await API.get(`resources/${resourceId}/download/`, {
+        const response = await API.get(url, {
             responseType: 'blob'
         });
         
-        let filename = resourceTitle;
+        let filename = fallbackFilename;
         const contentDisposition = response.headers['content-disposition'];
         if (contentDisposition) {
             const filenameMatch = /filename="(.+)"/.exec(contentDisposition);
@@ -399,6 +439,51 @@ export const addLessonResource = async (lessonResourceData) => {
     return response.data;
 };
 
+const UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024;
+const UPLOAD_RETRIES = 3;
+
+// Sends one file through a resumable upload session: chunks are PUT at the
+// offset the server reports, so a dropped request resumes instead of restarting.
+export const uploadLessonResource = async (lessonId, title, file, onProgress) => {
+    const { data: session } = await API.post("admin/lessons/resources/uploads/", {
+        lesson: lessonId,
+        title,
+        filename: file.name,
+        size: file.size,
+    });
+    const sessionUrl = `admin/lessons/resources/uploads/${session.id}/`;
+
+    let offset = 0;
+    let failures = 0;
+    while (offset < file.size) {
+        const chunk = file.slice(offset, offset + UPLOAD_CHUNK_SIZE);
+        try {
+            const response = await API.put(sessionUrl, chunk, {
+                headers: {
+                    "Content-Type": "application/offset+octet-stream",
+                    "Upload-Offset": offset,
+                },
+            });
+            offset = Number(response.headers["upload-offset"]);
+            failures = 0;
+            if (onProgress) onProgress(offset / file.size);
+        } catch (error) {
+            failures += 1;
+            if (failures > UPLOAD_RETRIES) throw error;
+            const { headers } = await API.get(sessionUrl);
+            offset = Number(headers["upload-offset"]);
+        }
+    }
+
+    const response = await API.post(`${sessionUrl}complete/`);
+    return response.data;
+};
+
+export const reorderAdminLessons = async (courseId, lessonIds) => {
+    const response = await API.put(`admin/courses/${courseId}/lessons/reorder/`, { lessons: lessonIds });
+    return response.data;
+};
+
 export const removeAdminLesson = async (lessonId) => {
     const response = await API.delete(`admin/lessons/${lessonId}/remove`);
     return response.data;